@@ -0,0 +1,303 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import io
+import os
+import json
+import logging
+import pickle
+import shutil
+import threading
+
+_logger = logging.getLogger('view-slides')
+
+LOG_FORMAT = 'view-slides-annotations'
+LOG_VERSION = 1
+# The log is rewritten with only the current annotations once it holds
+# more than COMPACT_FACTOR records for every live one.
+COMPACT_FACTOR = 4
+MIN_COMPACT_RECORDS = 64
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    "Unpickler that refuses to load anything but plain data"
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(
+            'annotations may not refer to {}.{}'.format(module, name))
+
+
+def read_pickled_annotations(data):
+    """Title, bookmarks and notes from an old annotations.pkl.
+
+    Files may come from other people over sharing, so only strings,
+    numbers, lists and dicts are accepted, never any class."""
+    pickle_input = io.BytesIO(data)
+    unpickler = _SafeUnpickler(pickle_input)
+    title = unpickler.load()
+    bookmarks = unpickler.load()
+    notes = unpickler.load()
+    if not isinstance(title, str) or not isinstance(bookmarks, list) or \
+            not isinstance(notes, dict):
+        raise pickle.UnpicklingError('not an annotations file')
+    return title, bookmarks, notes
+
+
+class AnnotationLog():
+    """Annotations kept as an append-only log of edits.
+
+    The file starts with a header line naming the format and version,
+    followed by one JSON record per line for every change to the title,
+    a note or a bookmark.  Saving appends only the records made since
+    the last save, and a partly written last record is dropped when the
+    log is read back.  Loading keeps where the latest note of each page
+    is rather than its text, notes are read when a page asks for them.
+    Once most records are out of date the log is compacted.
+
+    Edits are made from the main loop, while save() and snapshot() may
+    run on a worker thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending = []
+        self._note_offsets = {}
+        self._records = 0
+        self._title = ''
+        self._bookmarks = set()
+
+    def load(self):
+        """Read the log, returning (title, bookmarks).
+
+        Notes are looked up later with read_note()."""
+        with self._lock:
+            title, bookmarks = self._load()
+            self._title = title
+            self._bookmarks = set(bookmarks)
+            return title, bookmarks
+
+    def _load(self):
+        self._pending = []
+        self._note_offsets = {}
+        self._records = 0
+        title = ''
+        bookmarks = set()
+        if not os.path.exists(self.path):
+            return title, bookmarks
+        good_end = 0
+        with open(self.path, 'rb') as f:
+            header = self._parse(f.readline())
+            if not isinstance(header, dict) or \
+                    header.get('format') != LOG_FORMAT:
+                _logger.warning('%s is not an annotation log', self.path)
+                return title, bookmarks
+            if header.get('version', 0) > LOG_VERSION:
+                _logger.warning('annotation log version %s is too new',
+                                header.get('version'))
+                return title, bookmarks
+            good_end = f.tell()
+            while True:
+                offset = f.tell()
+                record = self._parse(f.readline())
+                if record is None:
+                    break
+                good_end = f.tell()
+                self._records += 1
+                if not self._is_valid(record):
+                    _logger.warning('skipping bad annotation record')
+                    continue
+                kind = record['type']
+                if kind == 'title':
+                    title = record['text']
+                elif kind == 'note':
+                    self._note_offsets[record['page']] = offset
+                elif kind == 'bookmark':
+                    if record['set']:
+                        bookmarks.add(record['page'])
+                    else:
+                        bookmarks.discard(record['page'])
+        if good_end < os.path.getsize(self.path):
+            # the last save was cut short, drop what it left behind
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_end)
+        return title, bookmarks
+
+    def _parse(self, line):
+        if not line.endswith(b'\n'):
+            return None
+        try:
+            return json.loads(line.decode('utf-8'))
+        except ValueError:
+            return None
+
+    def _is_valid(self, record):
+        "Whether a record has the fields its type needs"
+        if not isinstance(record, dict):
+            return False
+        kind = record.get('type')
+        if kind == 'title':
+            return isinstance(record.get('text'), str)
+        page = record.get('page')
+        if not isinstance(page, int) or isinstance(page, bool):
+            return False
+        if kind == 'note':
+            return isinstance(record.get('text'), str)
+        if kind == 'bookmark':
+            return isinstance(record.get('set'), bool)
+        return False
+
+    def get_note_pages(self):
+        "Pages with a note in the log, saved or not"
+        with self._lock:
+            pages = set(self._note_offsets.keys())
+            for record in self._pending:
+                if record['type'] == 'note':
+                    pages.add(record['page'])
+            return pages
+
+    def read_note(self, page):
+        "The saved note of a page, or '' if it has none"
+        with self._lock:
+            offset = self._note_offsets.get(page)
+            if offset is None:
+                return ''
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                record = self._parse(f.readline())
+        if record is None or not self._is_valid(record) or \
+                record['type'] != 'note':
+            return ''
+        return record['text']
+
+    def set_title(self, title):
+        with self._lock:
+            self._title = title
+            self._pending.append({'type': 'title', 'text': title})
+
+    def set_note(self, page, text):
+        with self._lock:
+            self._pending.append(
+                {'type': 'note', 'page': page, 'text': text})
+
+    def set_bookmark(self, page, state):
+        with self._lock:
+            if state:
+                self._bookmarks.add(page)
+            else:
+                self._bookmarks.discard(page)
+            self._pending.append(
+                {'type': 'bookmark', 'page': page, 'set': state})
+
+    def is_dirty(self):
+        "Whether there are edits that are not saved yet"
+        with self._lock:
+            return len(self._pending) > 0
+
+    def save(self):
+        """Append the edits made since the last save.
+
+        Only one thread may save at a time.  The lock is not held while
+        the edits are written, so edits can go on meanwhile."""
+        with self._lock:
+            if not self._pending:
+                return
+            live = 1 + len(self._bookmarks) + len(self.get_note_pages())
+            records = self._records + len(self._pending)
+            if records > MIN_COMPACT_RECORDS and \
+                    records > live * COMPACT_FACTOR:
+                self.compact()
+                return
+            pending = self._pending
+            self._pending = []
+        note_offsets = {}
+        try:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, 'ab') as f:
+                if new_file:
+                    f.write(self._format(
+                        {'format': LOG_FORMAT, 'version': LOG_VERSION}))
+                for record in pending:
+                    offset = f.tell()
+                    f.write(self._format(record))
+                    if record['type'] == 'note':
+                        note_offsets[record['page']] = offset
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            with self._lock:
+                # keep the edits for the next save
+                self._pending = pending + self._pending
+            raise
+        with self._lock:
+            self._note_offsets.update(note_offsets)
+            self._records += len(pending)
+
+    def compact(self):
+        "Rewrite the log with one record per current annotation"
+        with self._lock:
+            notes = {}
+            for page in self._note_offsets:
+                notes[page] = self.read_note(page)
+            for record in self._pending:
+                if record['type'] == 'note':
+                    notes[record['page']] = record['text']
+            self.write(self._title, self._bookmarks, notes)
+
+    def snapshot(self, path):
+        "Copy the saved log to path, replacing what is there in one step"
+        temp_path = path + '.tmp'
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'rb') as source, \
+                    open(temp_path, 'wb') as f:
+                shutil.copyfileobj(source, f)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def write(self, title, bookmarks, notes):
+        "Replace the log with the annotations given"
+        with self._lock:
+            temp_path = self.path + '.tmp'
+            note_offsets = {}
+            with open(temp_path, 'wb') as f:
+                f.write(self._format(
+                    {'format': LOG_FORMAT, 'version': LOG_VERSION}))
+                f.write(self._format({'type': 'title', 'text': title}))
+                records = 1
+                for page in sorted(bookmarks):
+                    f.write(self._format(
+                        {'type': 'bookmark', 'page': page, 'set': True}))
+                    records += 1
+                for page in sorted(notes):
+                    if notes[page] == '':
+                        continue
+                    note_offsets[page] = f.tell()
+                    f.write(self._format(
+                        {'type': 'note', 'page': page, 'text': notes[page]}))
+                    records += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._note_offsets = note_offsets
+            self._records = records
+            self._pending = []
+            self._title = title
+            self._bookmarks = set(bookmarks)
+
+    def _format(self, record):
+        return json.dumps(record).encode('utf-8') + b'\n'
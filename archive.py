@@ -0,0 +1,591 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import re
+import copy
+import json
+import mmap
+import hashlib
+import logging
+import struct
+import tarfile
+import zipfile
+
+_logger = logging.getLogger('view-slides')
+
+_LOCAL_HEADER_FORMAT = '<4s2B4HL2L2H'
+_LOCAL_HEADER_SIZE = struct.calcsize(_LOCAL_HEADER_FORMAT)
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# Bytes copied at a time when a member is moved between archives
+COPY_BLOCK_SIZE = 1024 * 1024
+
+# Bytes from each end of a tar archive hashed to recognise it again
+TAR_FINGERPRINT_SIZE = 65536
+# Tar archives whose member index is kept on disk
+MAX_CACHED_INDEXES = 20
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.bmp')
+
+
+def is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def natural_sort_key(name):
+    "Sort key that puts page2.jpg before page10.jpg"
+    return [int(part) if part.isdigit() else part.lower()
+            for part in re.split(r'(\d+)', name)]
+
+
+def archive_fingerprint(path):
+    """Cheap identity of a zip archive, or None if it is not one.
+
+    Only the pages are hashed, by the name, size and CRC the central
+    directory gives for them, so nothing is decompressed.  The
+    annotations stored in the archive change whenever it is saved and
+    are left out, so the archive is still recognised afterwards."""
+    try:
+        with zipfile.ZipFile(path, 'r') as zf:
+            return _get_pages_fingerprint(zf.infolist())
+    except zipfile.BadZipFile:
+        return None
+
+
+def _get_pages_fingerprint(infolist):
+    "Fingerprint of the pages among the members in infolist"
+    digest = hashlib.sha1()
+    for info in ArchiveIndex(infolist).get_infos():
+        digest.update('{}\0{}\0{}\n'.format(
+            info.filename, info.file_size, info.CRC).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ArchiveError(zipfile.BadZipFile):
+    "A member of an archive could not be read"
+
+
+def _get_member_size(info):
+    "Bytes a member takes up in the archive, headers included"
+    size = _LOCAL_HEADER_SIZE + len(info.filename.encode('utf-8')) + \
+        len(info.extra) + info.compress_size
+    if info.flag_bits & 0x08:
+        # followed by a data descriptor
+        size += 16
+    return size
+
+
+def replace_member(path, name, data):
+    """Replace or add one member of a zip archive in place.
+
+    Only the new member and the central directory are written, the
+    other members are left where they are.  When the old copy of the
+    member is the last one in the archive it is overwritten, otherwise
+    it is left behind unused.  Returns the number of bytes in the
+    archive no longer used by any member, so the caller can tell when
+    the archive is worth rewriting in full."""
+    with zipfile.ZipFile(path, 'a') as zf:
+        old = zf.NameToInfo.pop(name, None)
+        if old is not None:
+            zf.filelist = [info for info in zf.filelist
+                           if info.filename != name]
+            if all(info.header_offset < old.header_offset
+                   for info in zf.filelist):
+                zf.start_dir = old.header_offset
+            zf._didModify = True
+        zf.writestr(name, data, zipfile.ZIP_DEFLATED)
+        used = sum(_get_member_size(info) for info in zf.filelist)
+        unused = zf.start_dir - used
+    return max(0, unused)
+
+
+def _get_data_offset(header, info):
+    "Offset of the data of a member given its local header"
+    if len(header) < _LOCAL_HEADER_SIZE:
+        raise zipfile.BadZipFile('Truncated member ' + info.filename)
+    fields = struct.unpack(_LOCAL_HEADER_FORMAT, header)
+    if fields[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile('Bad local header ' + info.filename)
+    name_length, extra_length = fields[10], fields[11]
+    return info.header_offset + _LOCAL_HEADER_SIZE + \
+        name_length + extra_length
+
+
+def copy_member(source, info, target, name=None):
+    """Copy a member of one open zip archive into another.
+
+    The compressed data is copied as it is, in COPY_BLOCK_SIZE blocks,
+    along with the CRC, sizes and compression method, so nothing is
+    decompressed or compressed again.  target must be open for writing
+    and name, if given, renames the member."""
+    new_info = copy.copy(info)
+    new_info.filename = name or info.filename
+    # the sizes go in the local header, not a trailing data descriptor
+    new_info.flag_bits &= ~0x08
+    # FileHeader adds a fresh zip64 record when one is needed
+    new_info.extra = zipfile._strip_extra(info.extra, (0x0001,))
+    source.fp.seek(info.header_offset)
+    start = _get_data_offset(source.fp.read(_LOCAL_HEADER_SIZE), info)
+    with target._lock:
+        target.fp.seek(target.start_dir)
+        new_info.header_offset = target.start_dir
+        target.fp.write(new_info.FileHeader())
+        source.fp.seek(start)
+        remaining = info.compress_size
+        while remaining > 0:
+            block = source.fp.read(min(remaining, COPY_BLOCK_SIZE))
+            if not block:
+                raise zipfile.BadZipFile('Truncated member ' + info.filename)
+            target.fp.write(block)
+            remaining -= len(block)
+        target.start_dir = target.fp.tell()
+        target.filelist.append(new_info)
+        target.NameToInfo[new_info.filename] = new_info
+        target._didModify = True
+
+
+class ArchiveIndex():
+    """The pages of an archive in reading order.
+
+    Built once when the archive is opened from its member list.  Only
+    image members are pages, sorted in natural order, and each page name
+    maps straight to its ZipInfo so reading a page needs no lookup in
+    the archive."""
+
+    def __init__(self, infolist):
+        pages = [info for info in infolist
+                 if not info.is_dir() and is_image_name(info.filename)]
+        pages.sort(key=lambda info: natural_sort_key(info.filename))
+        self._names = [info.filename for info in pages]
+        self._infos = {}
+        self._pages = {}
+        for page, info in enumerate(pages):
+            self._infos[info.filename] = info
+            self._pages[info.filename] = page
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._infos
+
+    def get_names(self):
+        return self._names
+
+    def get_name(self, page):
+        return self._names[page]
+
+    def get_page(self, name):
+        "Page number of a member, or None if it is not a page"
+        return self._pages.get(name)
+
+    def get_info(self, name):
+        return self._infos[name]
+
+    def get_infos(self):
+        "Members of the pages in reading order"
+        return [self._infos[name] for name in self._names]
+
+
+class _ViewFile():
+    "Minimal read only file object over a memoryview"
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def read(self, size=-1):
+        start = self._position
+        if size < 0:
+            end = len(self._view)
+        else:
+            end = min(len(self._view), start + size)
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    def seek(self, offset):
+        self._position = offset
+        return offset
+
+    def close(self):
+        self._view = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MappedArchive():
+    """Read the members of an open zip archive through a memory map.
+
+    Most comic archives store their images without compression, since
+    JPEG and PNG data does not deflate.  open() reads those members
+    straight from the mapped file, skipping the ZipFile and its file
+    position lock, so pages can be read from several threads at once;
+    compressed or encrypted members are opened through the ZipFile as
+    usual.  Either way a page is read in pieces as it is decoded, never
+    copied whole."""
+
+    def __init__(self, zf, path):
+        self._zf = zf
+        self._file = open(path, 'rb')
+        self._map = None
+        self._view = None
+        self._data_offsets = {}
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def is_mapped(self, info):
+        "Whether a member can be read straight from the map"
+        return self._view is not None and \
+            info.compress_type == zipfile.ZIP_STORED and \
+            not info.flag_bits & 0x1
+
+    def read(self, info):
+        "Contents of a member, as a memoryview if it is stored"
+        if not self.is_mapped(info):
+            return self._zf.read(info)
+        start = self._get_data_offset(info)
+        if start + info.file_size > len(self._view):
+            raise zipfile.BadZipFile('Truncated member ' + info.filename)
+        return self._view[start:start + info.file_size]
+
+    def open(self, info):
+        "File object reading a member, copying only what is read"
+        if not self.is_mapped(info):
+            return self._zf.open(info)
+        return _ViewFile(self.read(info))
+
+    def _get_data_offset(self, info):
+        start = self._data_offsets.get(info.filename)
+        if start is None:
+            header = self._view[info.header_offset:
+                                info.header_offset + _LOCAL_HEADER_SIZE]
+            start = _get_data_offset(header, info)
+            self._data_offsets[info.filename] = start
+        return start
+
+    def close(self):
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._map is not None:
+                self._map.close()
+        except BufferError:
+            # a page is still being decoded from the map, it is
+            # unmapped once the last view of it goes away
+            pass
+        self._view = None
+        self._map = None
+        self._file.close()
+
+
+class ZipArchive():
+    """A zip (.cbz) archive opened for viewing.
+
+    This and TarArchive are the archive backends, both give the list of
+    members with infolist() and read members with read() and open()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._zf = zipfile.ZipFile(path, 'r')
+        self._reader = MappedArchive(self._zf, path)
+
+    def infolist(self):
+        return self._zf.infolist()
+
+    def read(self, info):
+        return self._reader.read(info)
+
+    def open(self, info):
+        return self._reader.open(info)
+
+    def read_member(self, name):
+        "Contents of the member called name, or None if there is none"
+        try:
+            return self._zf.read(name)
+        except KeyError:
+            return None
+
+    def get_fingerprint(self):
+        return _get_pages_fingerprint(self._zf.infolist())
+
+    def close(self):
+        self._reader.close()
+        self._zf.close()
+
+
+class _TarMember():
+    "Where the data of one tar member is found"
+
+    def __init__(self, filename, offset, size):
+        self.filename = filename
+        self.offset = offset
+        self.file_size = size
+
+    def is_dir(self):
+        return False
+
+
+class _RangeFile():
+    "Read only file object over part of a file, read with pread"
+
+    def __init__(self, fd, offset, size):
+        self._fd = fd
+        self._start = offset
+        self._end = offset + size
+        self._position = offset
+
+    def read(self, size=-1):
+        remaining = self._end - self._position
+        if size < 0 or size > remaining:
+            size = remaining
+        data = os.pread(self._fd, size, self._position)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset):
+        self._position = self._start + offset
+        return offset
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def tar_fingerprint(path):
+    """Cheap identity of a tar archive.
+
+    Tar has no central directory, so both ends of the file are hashed
+    instead.  Members are padded to whole blocks, so a page edited in
+    the middle often leaves the size and both ends as they were, and
+    the inode and modification time are hashed as well."""
+    stat = os.stat(path)
+    digest = hashlib.sha1('{} {} {}'.format(
+        stat.st_size, stat.st_ino, stat.st_mtime_ns).encode('ascii'))
+    size = stat.st_size
+    with open(path, 'rb') as f:
+        digest.update(f.read(TAR_FINGERPRINT_SIZE))
+        f.seek(max(0, size - TAR_FINGERPRINT_SIZE))
+        digest.update(f.read(TAR_FINGERPRINT_SIZE))
+    return digest.hexdigest()
+
+
+class TarArchive():
+    """An uncompressed tar (.cbt) archive opened for viewing.
+
+    Tar archives have no table of contents, so the member headers are
+    walked once and the offset and size of every file kept in an index.
+    The index is saved in index_dir under the archive fingerprint, so
+    opening the archive again reads no headers at all, and every member
+    is then read with a single pread.  Reading is safe from several
+    threads."""
+
+    def __init__(self, path, index_dir=None):
+        self.path = path
+        self._fingerprint = tar_fingerprint(path)
+        self._index_path = None
+        if index_dir is not None:
+            self._index_path = os.path.join(
+                index_dir, self._fingerprint + '.json')
+        self._members = self._load_index()
+        if self._members is None:
+            self._members = self._scan()
+            self._save_index()
+        self._infos = {}
+        for info in self._members:
+            self._infos[info.filename] = info
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def _scan(self):
+        members = []
+        with tarfile.open(self.path, 'r:') as tf:
+            for member in tf:
+                if member.isfile():
+                    members.append(_TarMember(
+                        member.name, member.offset_data, member.size))
+        return members
+
+    def _load_index(self):
+        if self._index_path is None or not os.path.exists(self._index_path):
+            return None
+        try:
+            with open(self._index_path) as f:
+                entries = json.load(f)
+            os.utime(self._index_path, None)
+        except (OSError, ValueError) as err:
+            _logger.warning('Cannot read tar index: %s', err)
+            return None
+        return [_TarMember(name, offset, size)
+                for name, offset, size in entries]
+
+    def _save_index(self):
+        if self._index_path is None:
+            return
+        entries = [[info.filename, info.offset, info.file_size]
+                   for info in self._members]
+        index_dir = os.path.dirname(self._index_path)
+        temp_path = self._index_path + '.tmp'
+        try:
+            if not os.path.exists(index_dir):
+                os.makedirs(index_dir)
+            with open(temp_path, 'w') as f:
+                json.dump(entries, f)
+            os.rename(temp_path, self._index_path)
+            indexes = sorted(
+                (os.path.getmtime(os.path.join(index_dir, name)), name)
+                for name in os.listdir(index_dir))
+            for mtime, name in indexes[:-MAX_CACHED_INDEXES]:
+                os.remove(os.path.join(index_dir, name))
+        except OSError as err:
+            _logger.warning('Cannot save tar index: %s', err)
+
+    def infolist(self):
+        return self._members
+
+    def read(self, info):
+        data = os.pread(self._fd, info.file_size, info.offset)
+        if len(data) < info.file_size:
+            raise ArchiveError('Truncated member ' + info.filename)
+        return data
+
+    def open(self, info):
+        return _RangeFile(self._fd, info.offset, info.file_size)
+
+    def read_member(self, name):
+        info = self._infos.get(name)
+        if info is None:
+            return None
+        return self.read(info)
+
+    def get_fingerprint(self):
+        return self._fingerprint
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _FileMember():
+    "A member of an unpacked archive and the file holding it"
+
+    def __init__(self, filename, path, size):
+        self.filename = filename
+        self.path = path
+        self.file_size = size
+
+    def is_dir(self):
+        return False
+
+
+class DirectoryArchive():
+    """An archive unpacked into a directory of plain files.
+
+    members is a list of (name, file name, size) giving the member name
+    each file in directory holds."""
+
+    def __init__(self, directory, members, fingerprint):
+        self.path = directory
+        self._fingerprint = fingerprint
+        self._members = [
+            _FileMember(name, os.path.join(directory, filename), size)
+            for name, filename, size in members]
+        self._infos = {}
+        for info in self._members:
+            self._infos[info.filename] = info
+
+    def infolist(self):
+        return self._members
+
+    def read(self, info):
+        try:
+            with open(info.path, 'rb') as f:
+                return f.read()
+        except OSError as err:
+            raise ArchiveError(str(err))
+
+    def open(self, info):
+        try:
+            return open(info.path, 'rb')
+        except OSError as err:
+            raise ArchiveError(str(err))
+
+    def read_member(self, name):
+        info = self._infos.get(name)
+        if info is None:
+            return None
+        return self.read(info)
+
+    def get_fingerprint(self):
+        return self._fingerprint
+
+    def close(self):
+        pass
+
+
+def get_fingerprint(path):
+    "Fingerprint of the archive at path, or None if it cannot be read"
+    if zipfile.is_zipfile(path):
+        return archive_fingerprint(path)
+    if is_tar_archive(path):
+        return tar_fingerprint(path)
+    return None
+
+
+def is_tar_archive(path):
+    "Whether path is a tar archive we can read members from directly"
+    try:
+        with tarfile.open(path, 'r:') as tf:
+            return tf.next() is not None
+    except (tarfile.TarError, OSError):
+        return False
+
+
+def open_archive(path, index_dir=None):
+    """Open a comic archive with the backend that can read it.
+
+    Returns None when the file is neither a zip nor an uncompressed tar
+    archive.  index_dir is where the member index of tar archives is
+    kept."""
+    if zipfile.is_zipfile(path):
+        return ZipArchive(path)
+    if is_tar_archive(path):
+        return TarArchive(path, index_dir)
+    return None
+
+
+def convert_to_zip(archive, path):
+    "Write every member of an open archive into a new zip at path"
+    with zipfile.ZipFile(path, 'w') as zf:
+        for info in archive.infolist():
+            zinfo = zipfile.ZipInfo(info.filename)
+            zinfo.file_size = info.file_size
+            with archive.open(info) as source, \
+                    zf.open(zinfo, 'w') as target:
+                while True:
+                    block = source.read(COPY_BLOCK_SIZE)
+                    if not block:
+                        break
+                    target.write(block)
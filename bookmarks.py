@@ -0,0 +1,74 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import bisect
+
+
+class BookmarkIndex():
+    """The bookmarked pages of a document.
+
+    A set answers whether a page is bookmarked, and a sorted list of
+    the same pages finds the bookmark before or after a page by
+    bisection, so neither depends on how many pages are bookmarked."""
+
+    def __init__(self, pages=()):
+        self._pages = set(pages)
+        self._sorted = sorted(self._pages)
+
+    def __contains__(self, page):
+        return page in self._pages
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def add(self, page):
+        if page not in self._pages:
+            self._pages.add(page)
+            bisect.insort(self._sorted, page)
+
+    def remove(self, page):
+        "Remove a bookmark, returning False if the page had none"
+        if page not in self._pages:
+            return False
+        self._pages.remove(page)
+        del self._sorted[bisect.bisect_left(self._sorted, page)]
+        return True
+
+    def get_pages(self):
+        "The bookmarked pages in order"
+        return list(self._sorted)
+
+    def get_previous(self, page):
+        """The last bookmark before page.
+
+        Wraps around to the last bookmark, returns None if there are no
+        bookmarks."""
+        if not self._sorted:
+            return None
+        i = bisect.bisect_left(self._sorted, page)
+        return self._sorted[i - 1]
+
+    def get_next(self, page):
+        """The first bookmark after page.
+
+        Wraps around to the first bookmark, returns None if there are no
+        bookmarks."""
+        if not self._sorted:
+            return None
+        i = bisect.bisect_right(self._sorted, page)
+        if i == len(self._sorted):
+            i = 0
+        return self._sorted[i]
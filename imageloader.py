@@ -0,0 +1,164 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import logging
+import struct
+
+from gi.repository import GdkPixbuf
+
+_logger = logging.getLogger('view-slides')
+
+# Bytes of a member read at a time while looking for the image size,
+# and the most we are willing to read before giving up.
+PROBE_CHUNK_SIZE = 8192
+MAX_PROBE_SIZE = 1024 * 1024
+# Bytes read from an image file and handed to the pixbuf loader at a time
+LOADER_CHUNK_SIZE = 65536
+
+_JPEG_SOF_MARKERS = frozenset(
+    [0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF])
+_JPEG_STANDALONE_MARKERS = frozenset(
+    [0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9])
+
+
+def load_pixbuf(fileobj, width=None, height=None):
+    """Decode an open image file into a pixbuf.
+
+    The file is fed to the loader LOADER_CHUNK_SIZE bytes at a time, so
+    neither it nor a compressed archive member is ever held in memory
+    whole.  If width and height are given the image is scaled as it is
+    decoded, which lets JPEG images skip most of the work, and the full
+    size pixels are never held in memory either."""
+    loader = GdkPixbuf.PixbufLoader()
+    if width is not None and height is not None:
+        loader.connect('size-prepared', _size_prepared_cb, width, height)
+    while True:
+        chunk = fileobj.read(LOADER_CHUNK_SIZE)
+        if not chunk:
+            break
+        loader.write(chunk)
+    loader.close()
+    return loader.get_pixbuf()
+
+
+def _size_prepared_cb(loader, image_width, image_height, width, height):
+    if image_width != width or image_height != height:
+        loader.set_size(width, height)
+
+
+def get_image_format(data):
+    "Guess the image format from the first bytes of the file"
+    head = bytes(data[:8])
+    if head.startswith(b'\xff\xd8'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'GIF87a') or head.startswith(b'GIF89a'):
+        return 'gif'
+    if head.startswith(b'II*\x00') or head.startswith(b'MM\x00*'):
+        return 'tiff'
+    if head.startswith(b'BM'):
+        return 'bmp'
+    return None
+
+
+def get_image_size(data):
+    """Return (width, height) read from the image headers in data.
+
+    Only the headers are parsed, nothing is decoded.  Returns None when
+    the format is unknown or data does not reach far enough."""
+    image_format = get_image_format(data)
+    try:
+        if image_format == 'jpeg':
+            return _get_jpeg_size(data)
+        if image_format == 'png':
+            if len(data) < 24:
+                return None
+            return struct.unpack_from('>II', data, 16)
+        if image_format == 'gif':
+            if len(data) < 10:
+                return None
+            return struct.unpack_from('<HH', data, 6)
+        if image_format == 'tiff':
+            return _get_tiff_size(data)
+        if image_format == 'bmp':
+            if len(data) < 26:
+                return None
+            width, height = struct.unpack_from('<ii', data, 18)
+            return width, abs(height)
+    except struct.error:
+        pass
+    return None
+
+
+def _get_jpeg_size(data):
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # fill byte
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from('>HH', data, i + 5)
+            return width, height
+        length, = struct.unpack_from('>H', data, i + 2)
+        i += 2 + length
+    return None
+
+
+def _get_tiff_size(data):
+    endian = '<' if bytes(data[:2]) == b'II' else '>'
+    ifd_offset, = struct.unpack_from(endian + 'I', data, 4)
+    entries, = struct.unpack_from(endian + 'H', data, ifd_offset)
+    width = height = None
+    for i in range(entries):
+        entry = ifd_offset + 2 + i * 12
+        tag, field_type = struct.unpack_from(endian + 'HH', data, entry)
+        if tag not in (256, 257):
+            continue
+        if field_type == 3:
+            value, = struct.unpack_from(endian + 'H', data, entry + 8)
+        else:
+            value, = struct.unpack_from(endian + 'I', data, entry + 8)
+        if tag == 256:
+            width = value
+        else:
+            height = value
+    if width is None or height is None:
+        return None
+    return width, height
+
+
+def probe_image_size(fileobj):
+    "Read just enough of an open image file to find its size"
+    data = fileobj.read(PROBE_CHUNK_SIZE)
+    if get_image_format(data) is None:
+        return None
+    size = get_image_size(data)
+    while size is None and len(data) < MAX_PROBE_SIZE:
+        chunk = fileobj.read(len(data))
+        if not chunk:
+            break
+        data += chunk
+        size = get_image_size(data)
+    return size
@@ -0,0 +1,78 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import re
+import bisect
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def get_words(text):
+    "The distinct words of a text, folded to lower case"
+    return set(word.casefold() for word in _WORD.findall(text))
+
+
+class NoteIndex():
+    """Inverted index from words to the pages whose notes use them.
+
+    Notes are added and replaced one page at a time, touching only the
+    words of that note.  A search looks up each word of the query and
+    intersects the pages found; the last word also matches longer words
+    it starts, found by bisecting a sorted list of every word."""
+
+    def __init__(self):
+        self._pages = {}
+        self._page_words = {}
+        self._words = []
+
+    def set_note(self, page, text):
+        "Index the note of a page, replacing what it said before"
+        old_words = self._page_words.pop(page, set())
+        new_words = get_words(text)
+        for word in old_words - new_words:
+            pages = self._pages[word]
+            pages.discard(page)
+            if not pages:
+                del self._pages[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+        for word in new_words - old_words:
+            pages = self._pages.get(word)
+            if pages is None:
+                pages = self._pages[word] = set()
+                bisect.insort(self._words, word)
+            pages.add(page)
+        if new_words:
+            self._page_words[page] = new_words
+
+    def _get_prefix_pages(self, prefix):
+        pages = set()
+        i = bisect.bisect_left(self._words, prefix)
+        while i < len(self._words) and self._words[i].startswith(prefix):
+            pages |= self._pages[self._words[i]]
+            i += 1
+        return pages
+
+    def search(self, query):
+        "Pages whose notes have every word of query, in page order"
+        words = [word.casefold() for word in _WORD.findall(query)]
+        if not words:
+            return []
+        result = self._get_prefix_pages(words[-1])
+        for word in words[:-1]:
+            if not result:
+                break
+            result = result & self._pages.get(word, set())
+        return sorted(result)
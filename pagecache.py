@@ -0,0 +1,82 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 32 * 1024 * 1024
+
+
+def get_pixbuf_size(pixbuf):
+    "Number of bytes of pixel data held by a pixbuf"
+    return pixbuf.get_rowstride() * pixbuf.get_height()
+
+
+class PixbufCache():
+    "Least recently used cache of scaled pixbufs with a byte budget"
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_size(self):
+        return self._bytes
+
+    def get(self, key):
+        try:
+            pixbuf, nbytes = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pixbuf
+
+    def put(self, key, pixbuf):
+        nbytes = get_pixbuf_size(pixbuf)
+        self.remove(key)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (pixbuf, nbytes)
+        self._bytes += nbytes
+        self._evict()
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            old_key, (old_pixbuf, old_nbytes) = \
+                self._entries.popitem(last=False)
+            self._bytes -= old_nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
@@ -0,0 +1,82 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+def get_fit_size(image_width, image_height, view_width, view_height):
+    "Size of an image scaled to fit entirely inside the view"
+    image_width = max(1, image_width)
+    image_height = max(1, image_height)
+    if image_height * view_width <= view_height * image_width:
+        # the image is wider than the view, fill the width
+        return view_width, max(1, image_height * view_width // image_width)
+    return max(1, image_width * view_height // image_height), view_height
+
+
+def get_width_size(image_width, image_height, view_width, view_height):
+    "Size of an image scaled to the width of the view"
+    image_width = max(1, image_width)
+    return view_width, max(1, image_height * view_width // image_width)
+
+
+def get_scaled_size(image_size, zoom_to_fit, view_width, view_height):
+    "Size an image of image_size is shown at in the view"
+    image_width, image_height = image_size
+    if zoom_to_fit:
+        return get_fit_size(image_width, image_height,
+                            view_width, view_height)
+    return get_width_size(image_width, image_height, view_width, view_height)
+
+
+class PageLayout():
+    """Scaled sizes of every page of an archive for one view size.
+
+    The sizes for both zoom modes are worked out in one pass when the
+    archive is indexed or the view changes size, so showing a page is
+    only a lookup."""
+
+    def __init__(self):
+        self._view_size = None
+        self._fit_sizes = {}
+        self._width_sizes = {}
+
+    def get_view_size(self):
+        return self._view_size
+
+    def compute(self, image_sizes, view_width, view_height):
+        "Lay out the pages in image_sizes, a dict of name to size"
+        fit_sizes = {}
+        width_sizes = {}
+        for name, (image_width, image_height) in image_sizes.items():
+            fit_sizes[name] = get_fit_size(
+                image_width, image_height, view_width, view_height)
+            width_sizes[name] = get_width_size(
+                image_width, image_height, view_width, view_height)
+        # swap the tables in whole, pages may be looked up from the
+        # prefetch threads
+        self._fit_sizes = fit_sizes
+        self._width_sizes = width_sizes
+        self._view_size = (view_width, view_height)
+
+    def clear(self):
+        self._view_size = None
+        self._fit_sizes = {}
+        self._width_sizes = {}
+
+    def get_size(self, name, zoom_to_fit):
+        "Scaled size of a page, or None if its size is not known"
+        if zoom_to_fit:
+            return self._fit_sizes.get(name)
+        return self._width_sizes.get(name)
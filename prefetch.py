@@ -0,0 +1,123 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gi.repository import GLib
+
+_logger = logging.getLogger('view-slides')
+
+WORKER_THREADS = 2
+# Seconds of decoding we are willing to do ahead of the reader, used to
+# work out how many pages to prefetch from the measured decode time.
+PREFETCH_TIME_BUDGET = 1.0
+DEFAULT_DEPTH = 2
+MAX_DEPTH = 4
+
+
+class PagePrefetcher():
+    """Render pages on worker threads while the user reads.
+
+    render_func is called on a worker thread with a page key and returns
+    a pixbuf.  done_func is called on the main loop with the key and the
+    pixbuf once it is ready."""
+
+    def __init__(self, render_func, done_func, workers=WORKER_THREADS):
+        self._render_func = render_func
+        self._done_func = done_func
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+        self._generation = 0
+        self._decode_time = None
+
+    def record_decode_time(self, seconds):
+        "Fold a measured decode time into the running average"
+        if self._decode_time is None:
+            self._decode_time = seconds
+        else:
+            self._decode_time = 0.7 * self._decode_time + 0.3 * seconds
+
+    def get_decode_time(self):
+        return self._decode_time
+
+    def get_depth(self):
+        "Number of pages ahead worth decoding at the current speed"
+        if not self._decode_time:
+            return DEFAULT_DEPTH
+        depth = int(PREFETCH_TIME_BUDGET / self._decode_time)
+        return max(1, min(MAX_DEPTH, depth))
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def prefetch(self, keys):
+        """Queue keys in order of priority.
+
+        Queued work for keys that are no longer wanted is cancelled."""
+        wanted = set(keys)
+        for key, future in list(self._pending.items()):
+            if key not in wanted and future.cancel():
+                del self._pending[key]
+        for key in keys:
+            if key not in self._pending:
+                self._pending[key] = self._executor.submit(
+                    self._run, key, self._generation)
+
+    def wait(self, key):
+        """Return the pixbuf for a key that is already being rendered.
+
+        Returns None if the key is not queued or could be cancelled, in
+        which case the caller should render it itself."""
+        future = self._pending.get(key)
+        if future is None:
+            return None
+        if future.cancel():
+            del self._pending[key]
+            return None
+        return future.result()
+
+    def cancel(self):
+        "Drop all queued work and ignore results still in flight"
+        self._generation += 1
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, key, generation):
+        start = time.time()
+        try:
+            pixbuf = self._render_func(key)
+        except Exception:
+            _logger.exception('Could not prefetch %s', key[0])
+            pixbuf = None
+        GLib.idle_add(self._finish, key, pixbuf, generation,
+                      time.time() - start)
+        return pixbuf
+
+    def _finish(self, key, pixbuf, generation, seconds):
+        if generation != self._generation:
+            return False
+        self._pending.pop(key, None)
+        if pixbuf is not None:
+            self.record_decode_time(seconds)
+            self._done_func(key, pixbuf)
+        return False
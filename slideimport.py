@@ -0,0 +1,146 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import json
+import hashlib
+import logging
+import zipfile
+import zlib
+
+_logger = logging.getLogger('view-slides')
+
+# Bytes of an image hashed at a time
+HASH_BLOCK_SIZE = 65536
+
+
+def get_file_digest(fileobj):
+    "(sha1, crc32, size) of the contents of an open file"
+    sha1 = hashlib.sha1()
+    crc = 0
+    size = 0
+    while True:
+        block = fileobj.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        sha1.update(block)
+        crc = zlib.crc32(block, crc)
+        size += len(block)
+    return sha1.hexdigest(), crc, size
+
+
+class SlideImporter():
+    """Add Journal images to a slideshow archive, storing each image once.
+
+    Every image is hashed once and the hash kept by Journal uid and
+    timestamp in hash_cache_path, so picking it again reads nothing.
+    An image whose bytes are already in the archive is not stored
+    again, and an image whose title is taken by a different image is
+    stored under a new name.  Members are looked up by name and by
+    size and CRC, both read from the archive directory, so an import
+    never scans the archive."""
+
+    def __init__(self, hash_cache_path):
+        self._hash_cache_path = hash_cache_path
+        self._digests = {}
+        self._path = None
+        self._names = set()
+        self._contents = {}
+        if os.path.exists(hash_cache_path):
+            try:
+                with open(hash_cache_path) as f:
+                    self._digests = json.load(f)
+            except (OSError, ValueError) as err:
+                _logger.warning('Cannot read image hashes: %s', err)
+
+    def open_archive(self, path):
+        "Learn what the slideshow archive at path already holds"
+        self._path = path
+        self._names = set()
+        self._contents = {}
+        if not zipfile.is_zipfile(path):
+            return
+        with zipfile.ZipFile(path, 'r') as zf:
+            for info in zf.infolist():
+                self._names.add(info.filename)
+                self._contents.setdefault(
+                    (info.file_size, info.CRC), info.filename)
+
+    def get_digest(self, uid, timestamp, file_path):
+        "(sha1, crc32, size) of a Journal image"
+        key = None
+        if uid is not None:
+            key = '{}:{}'.format(uid, timestamp)
+            digest = self._digests.get(key)
+            if digest is not None:
+                return tuple(digest)
+        with open(file_path, 'rb') as f:
+            digest = get_file_digest(f)
+        if key is not None:
+            self._digests[key] = list(digest)
+            self._save_digests()
+        return digest
+
+    def _save_digests(self):
+        temp_path = self._hash_cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self._digests, f)
+            os.rename(temp_path, self._hash_cache_path)
+        except OSError as err:
+            _logger.warning('Cannot save image hashes: %s', err)
+
+    def _find(self, digest):
+        "Name of the member holding the same bytes, or None"
+        sha1, crc, size = digest
+        name = self._contents.get((size, crc))
+        if name is None:
+            return None
+        # a CRC can collide, make sure with the hash
+        with zipfile.ZipFile(self._path, 'r') as zf:
+            with zf.open(name) as f:
+                if get_file_digest(f)[0] == sha1:
+                    return name
+        return None
+
+    def make_name(self, title):
+        "title, or a variant of it no member is using yet"
+        if title not in self._names:
+            return title
+        base, extension = os.path.splitext(title)
+        number = 2
+        while True:
+            name = '{}-{}{}'.format(base, number, extension)
+            if name not in self._names:
+                return name
+            number += 1
+
+    def add(self, uid, timestamp, file_path, title):
+        """Store an image in the archive unless it is there already.
+
+        Returns the name of the member holding the image and whether it
+        was added."""
+        digest = self.get_digest(uid, timestamp, file_path)
+        name = self._find(digest)
+        if name is not None:
+            return name, False
+        name = self.make_name(title)
+        with zipfile.ZipFile(self._path, 'a') as zf:
+            zf.write(file_path, name)
+        sha1, crc, size = digest
+        self._names.add(name)
+        self._contents[(size, crc)] = name
+        return name, True
@@ -0,0 +1,168 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from annotationlog import AnnotationLog, read_pickled_annotations, \
+    MIN_COMPACT_RECORDS
+
+HEADER = b'{"format": "view-slides-annotations", "version": 1}\n'
+
+
+class AnnotationLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'annotations.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def reopen(self):
+        log = AnnotationLog(self.path)
+        title, bookmarks = log.load()
+        return log, title, bookmarks
+
+    def test_missing_file(self):
+        log, title, bookmarks = self.reopen()
+        self.assertEqual((title, bookmarks), ('', set()))
+        self.assertEqual(log.read_note(0), '')
+        self.assertFalse(log.is_dirty())
+
+    def test_save_and_load(self):
+        log = AnnotationLog(self.path)
+        log.load()
+        log.set_title('Comic')
+        log.set_note(2, 'first')
+        log.set_bookmark(4, True)
+        log.set_bookmark(6, True)
+        log.set_bookmark(4, False)
+        self.assertTrue(log.is_dirty())
+        self.assertEqual(log.get_note_pages(), set([2]))
+        log.save()
+        self.assertFalse(log.is_dirty())
+        self.assertEqual(log.read_note(2), 'first')
+
+        log.set_note(2, 'second')
+        log.save()
+        log, title, bookmarks = self.reopen()
+        self.assertEqual(title, 'Comic')
+        self.assertEqual(bookmarks, set([6]))
+        self.assertEqual(log.get_note_pages(), set([2]))
+        self.assertEqual(log.read_note(2), 'second')
+        self.assertEqual(log.read_note(3), '')
+
+    def test_cut_short(self):
+        log = AnnotationLog(self.path)
+        log.load()
+        log.set_note(1, 'kept')
+        log.save()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(b'{"type": "note", "page": 1, "te')
+        log, title, bookmarks = self.reopen()
+        self.assertEqual(log.read_note(1), 'kept')
+        # the partial record is dropped so the next save follows on
+        self.assertEqual(os.path.getsize(self.path), size)
+
+    def test_bad_records(self):
+        with open(self.path, 'wb') as f:
+            f.write(HEADER)
+            f.write(b'{"type": "note"}\n')
+            f.write(b'{"type": "note", "page": [1], "text": "x"}\n')
+            f.write(b'{"type": "note", "page": true, "text": "x"}\n')
+            f.write(b'{"type": "note", "page": 2, "text": 5}\n')
+            f.write(b'{"type": "bookmark", "page": 3, "set": "yes"}\n')
+            f.write(b'{"type": "title", "text": null}\n')
+            f.write(b'["not", "a", "record"]\n')
+            f.write(b'{"type": "note", "page": 4, "text": "good"}\n')
+            f.write(b'{"type": "bookmark", "page": 5, "set": true}\n')
+        log, title, bookmarks = self.reopen()
+        self.assertEqual(title, '')
+        self.assertEqual(bookmarks, set([5]))
+        self.assertEqual(log.get_note_pages(), set([4]))
+        self.assertEqual(log.read_note(4), 'good')
+
+    def test_not_a_log(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{"format": "something else"}\n')
+        log, title, bookmarks = self.reopen()
+        self.assertEqual((title, bookmarks), ('', set()))
+
+    def test_compact(self):
+        log = AnnotationLog(self.path)
+        log.load()
+        for i in range(MIN_COMPACT_RECORDS + 1):
+            log.set_note(1, 'note {}'.format(i))
+            log.save()
+        with open(self.path, 'rb') as f:
+            self.assertLess(len(f.readlines()), MIN_COMPACT_RECORDS)
+        log, title, bookmarks = self.reopen()
+        self.assertEqual(log.read_note(1),
+                         'note {}'.format(MIN_COMPACT_RECORDS))
+
+    def test_write(self):
+        log = AnnotationLog(self.path)
+        log.load()
+        log.set_note(9, 'dropped')
+        log.write('Title', [3, 1], {1: 'one', 2: ''})
+        self.assertFalse(log.is_dirty())
+        log, title, bookmarks = self.reopen()
+        self.assertEqual(title, 'Title')
+        self.assertEqual(bookmarks, set([1, 3]))
+        self.assertEqual(log.get_note_pages(), set([1]))
+        self.assertEqual(log.read_note(1), 'one')
+
+    def test_snapshot(self):
+        copy_path = os.path.join(self.dir, 'copy.jsonl')
+        log = AnnotationLog(self.path)
+        log.load()
+        log.snapshot(copy_path)
+        self.assertFalse(os.path.exists(copy_path))
+        log.set_note(1, 'saved')
+        log.save()
+        log.set_note(1, 'not saved')
+        log.snapshot(copy_path)
+        copy = AnnotationLog(copy_path)
+        copy.load()
+        self.assertEqual(copy.read_note(1), 'saved')
+
+
+class PickledAnnotationsTest(unittest.TestCase):
+
+    def test_read(self):
+        data = pickle.dumps('Title') + pickle.dumps([1, 2]) + \
+            pickle.dumps({1: 'note'})
+        self.assertEqual(read_pickled_annotations(data),
+                         ('Title', [1, 2], {1: 'note'}))
+
+    def test_refuse_classes(self):
+        data = pickle.dumps(os.getcwd) + pickle.dumps([]) + pickle.dumps({})
+        self.assertRaises(pickle.UnpicklingError,
+                          read_pickled_annotations, data)
+
+    def test_wrong_types(self):
+        data = pickle.dumps(1) + pickle.dumps([]) + pickle.dumps({})
+        self.assertRaises(pickle.UnpicklingError,
+                          read_pickled_annotations, data)
+
+
+if __name__ == '__main__':
+    unittest.main()
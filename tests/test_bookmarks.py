@@ -0,0 +1,65 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import unittest
+
+from bookmarks import BookmarkIndex
+
+
+class BookmarkIndexTest(unittest.TestCase):
+
+    def test_empty(self):
+        bookmarks = BookmarkIndex()
+        self.assertEqual(len(bookmarks), 0)
+        self.assertIsNone(bookmarks.get_previous(3))
+        self.assertIsNone(bookmarks.get_next(3))
+
+    def test_add_remove(self):
+        bookmarks = BookmarkIndex([7, 2])
+        bookmarks.add(5)
+        bookmarks.add(5)
+        self.assertEqual(bookmarks.get_pages(), [2, 5, 7])
+        self.assertIn(5, bookmarks)
+        self.assertTrue(bookmarks.remove(5))
+        self.assertFalse(bookmarks.remove(5))
+        self.assertNotIn(5, bookmarks)
+        self.assertEqual(bookmarks.get_pages(), [2, 7])
+        self.assertEqual(len(bookmarks), 2)
+
+    def test_previous(self):
+        bookmarks = BookmarkIndex([2, 5, 7])
+        self.assertEqual(bookmarks.get_previous(6), 5)
+        self.assertEqual(bookmarks.get_previous(5), 2)
+        # wraps around to the last bookmark
+        self.assertEqual(bookmarks.get_previous(2), 7)
+        self.assertEqual(bookmarks.get_previous(0), 7)
+
+    def test_next(self):
+        bookmarks = BookmarkIndex([2, 5, 7])
+        self.assertEqual(bookmarks.get_next(3), 5)
+        self.assertEqual(bookmarks.get_next(5), 7)
+        # wraps around to the first bookmark
+        self.assertEqual(bookmarks.get_next(7), 2)
+        self.assertEqual(bookmarks.get_next(9), 2)
+
+    def test_single(self):
+        bookmarks = BookmarkIndex([4])
+        self.assertEqual(bookmarks.get_previous(4), 4)
+        self.assertEqual(bookmarks.get_next(4), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from archive import copy_member
+
+
+class CopyMemberTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.dir, 'source.cbz')
+        self.target = os.path.join(self.dir, 'target.cbz')
+        self.contents = {
+            'stored.jpg': (b'1' * 1000, zipfile.ZIP_STORED),
+            'deflated.png': (b'2' * 1000, zipfile.ZIP_DEFLATED),
+            'dir/ComicInfo.xml': (b'<ComicInfo/>', zipfile.ZIP_DEFLATED),
+        }
+        with zipfile.ZipFile(self.source, 'w') as zf:
+            for name, (data, compress_type) in self.contents.items():
+                zf.writestr(name, data, compress_type)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def copy(self, names=None):
+        with zipfile.ZipFile(self.source) as source, \
+                zipfile.ZipFile(self.target, 'w') as target:
+            for info in source.infolist():
+                copy_member(source, info, target,
+                            names and names[info.filename])
+
+    def test_copy(self):
+        self.copy()
+        with zipfile.ZipFile(self.source) as source, \
+                zipfile.ZipFile(self.target) as target:
+            self.assertIsNone(target.testzip())
+            self.assertEqual(target.namelist(), source.namelist())
+            for info in source.infolist():
+                new_info = target.getinfo(info.filename)
+                self.assertEqual(new_info.compress_type, info.compress_type)
+                self.assertEqual(new_info.compress_size, info.compress_size)
+                self.assertEqual(new_info.CRC, info.CRC)
+                self.assertEqual(target.read(info.filename),
+                                 source.read(info.filename))
+
+    def test_rename(self):
+        self.copy(dict((name, 'new/' + name) for name in self.contents))
+        with zipfile.ZipFile(self.target) as target:
+            self.assertIsNone(target.testzip())
+            for name, (data, compress_type) in self.contents.items():
+                self.assertEqual(target.read('new/' + name), data)
+
+    def test_write_after_copy(self):
+        with zipfile.ZipFile(self.source) as source, \
+                zipfile.ZipFile(self.target, 'w') as target:
+            copy_member(source, source.getinfo('deflated.png'), target)
+            target.writestr('annotations.jsonl', b'{}\n')
+        with zipfile.ZipFile(self.target) as target:
+            self.assertIsNone(target.testzip())
+            self.assertEqual(target.read('deflated.png'), b'2' * 1000)
+            self.assertEqual(target.read('annotations.jsonl'), b'{}\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
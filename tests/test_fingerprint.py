@@ -0,0 +1,97 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from archive import ZipArchive, archive_fingerprint, replace_member, \
+    tar_fingerprint
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'book.cbz')
+        with zipfile.ZipFile(self.path, 'w') as zf:
+            zf.writestr('page1.jpg', b'1' * 100)
+            zf.writestr('page2.jpg', b'2' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_annotations_ignored(self):
+        fingerprint = archive_fingerprint(self.path)
+        replace_member(self.path, 'annotations.jsonl', b'P1')
+        self.assertEqual(archive_fingerprint(self.path), fingerprint)
+        replace_member(self.path, 'annotations.jsonl', b'P12')
+        self.assertEqual(archive_fingerprint(self.path), fingerprint)
+        archive = ZipArchive(self.path)
+        try:
+            self.assertEqual(archive.get_fingerprint(), fingerprint)
+        finally:
+            archive.close()
+
+    def test_pages_changed(self):
+        fingerprint = archive_fingerprint(self.path)
+        replace_member(self.path, 'page2.jpg', b'3' * 100)
+        self.assertNotEqual(archive_fingerprint(self.path), fingerprint)
+
+    def test_not_a_zip(self):
+        path = os.path.join(self.dir, 'notes.txt')
+        with open(path, 'wb') as f:
+            f.write(b'not a zip')
+        self.assertIsNone(archive_fingerprint(path))
+
+
+class TarFingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'book.cbt')
+        with tarfile.open(self.path, 'w') as tf:
+            for name in ('page1.jpg', 'page2.jpg', 'page3.jpg'):
+                info = tarfile.TarInfo(name)
+                info.size = 100
+                tf.addfile(info, io.BytesIO(b'1' * 100))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_same_file(self):
+        self.assertEqual(tar_fingerprint(self.path),
+                         tar_fingerprint(self.path))
+
+    def test_page_edited_in_place(self):
+        fingerprint = tar_fingerprint(self.path)
+        stat = os.stat(self.path)
+        with open(self.path, 'r+b') as f:
+            # the data of page2.jpg, same size and far from either end
+            # in a large archive
+            f.seek(3 * 512)
+            f.write(b'2' * 100)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(os.path.getsize(self.path), stat.st_size)
+        self.assertNotEqual(tar_fingerprint(self.path), fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
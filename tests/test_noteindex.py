@@ -0,0 +1,61 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import unittest
+
+from noteindex import NoteIndex, get_words
+
+
+class NoteIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NoteIndex()
+        self.index.set_note(0, 'The dragon sleeps')
+        self.index.set_note(3, 'A dragon awakes, Drama!')
+        self.index.set_note(5, 'Nothing to see')
+
+    def test_get_words(self):
+        self.assertEqual(get_words('Dragon, dragon; DRAGON fire'),
+                         set(['dragon', 'fire']))
+
+    def test_search(self):
+        self.assertEqual(self.index.search('dragon'), [0, 3])
+        self.assertEqual(self.index.search('DRAGON sleeps'), [0])
+        self.assertEqual(self.index.search('unicorn'), [])
+        self.assertEqual(self.index.search(' ,. '), [])
+
+    def test_prefix(self):
+        # only the last word of the query matches as a prefix
+        self.assertEqual(self.index.search('dra'), [0, 3])
+        self.assertEqual(self.index.search('dragon awa'), [3])
+        self.assertEqual(self.index.search('dra awakes'), [])
+
+    def test_replace_note(self):
+        self.index.set_note(0, 'A quiet cave')
+        self.assertEqual(self.index.search('dragon'), [3])
+        self.assertEqual(self.index.search('sleeps'), [])
+        self.assertEqual(self.index.search('cave'), [0])
+
+    def test_clear_note(self):
+        self.index.set_note(3, '')
+        self.assertEqual(self.index.search('dra'), [0])
+        self.index.set_note(0, '')
+        self.assertEqual(self.index.search('dra'), [])
+        self.assertEqual(self.index.search('see'), [5])
+
+
+if __name__ == '__main__':
+    unittest.main()
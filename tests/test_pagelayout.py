@@ -0,0 +1,78 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import unittest
+
+from pagelayout import PageLayout, get_fit_size, get_width_size, \
+    get_scaled_size
+
+
+class SizeTest(unittest.TestCase):
+
+    def test_fit_wide_image(self):
+        self.assertEqual(get_fit_size(2000, 1000, 800, 600), (800, 400))
+
+    def test_fit_tall_image(self):
+        self.assertEqual(get_fit_size(1000, 2000, 800, 600), (300, 600))
+
+    def test_fit_same_shape(self):
+        self.assertEqual(get_fit_size(400, 300, 800, 600), (800, 600))
+
+    def test_fit_never_empty(self):
+        self.assertEqual(get_fit_size(100000, 1, 800, 600), (800, 1))
+        self.assertEqual(get_fit_size(0, 0, 800, 600), (600, 600))
+
+    def test_width(self):
+        self.assertEqual(get_width_size(1000, 3000, 800, 600), (800, 2400))
+        self.assertEqual(get_width_size(0, 10, 800, 600), (800, 8000))
+
+    def test_scaled(self):
+        self.assertEqual(get_scaled_size((1000, 3000), True, 800, 600),
+                         (200, 600))
+        self.assertEqual(get_scaled_size((1000, 3000), False, 800, 600),
+                         (800, 2400))
+
+
+class PageLayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layout = PageLayout()
+        self.layout.compute(
+            {'a.jpg': (1000, 3000), 'b.png': (2000, 1000)}, 800, 600)
+
+    def test_sizes(self):
+        self.assertEqual(self.layout.get_view_size(), (800, 600))
+        self.assertEqual(self.layout.get_size('a.jpg', True), (200, 600))
+        self.assertEqual(self.layout.get_size('a.jpg', False), (800, 2400))
+        self.assertEqual(self.layout.get_size('b.png', True), (800, 400))
+
+    def test_unknown_page(self):
+        self.assertIsNone(self.layout.get_size('c.gif', True))
+
+    def test_compute_replaces(self):
+        self.layout.compute({'a.jpg': (1000, 3000)}, 400, 300)
+        self.assertEqual(self.layout.get_view_size(), (400, 300))
+        self.assertEqual(self.layout.get_size('a.jpg', False), (400, 1200))
+        self.assertIsNone(self.layout.get_size('b.png', True))
+
+    def test_clear(self):
+        self.layout.clear()
+        self.assertIsNone(self.layout.get_view_size())
+        self.assertIsNone(self.layout.get_size('a.jpg', True))
+
+
+if __name__ == '__main__':
+    unittest.main()
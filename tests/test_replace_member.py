@@ -0,0 +1,70 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from archive import replace_member
+
+
+class ReplaceMemberTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'book.cbz')
+        with zipfile.ZipFile(self.path, 'w') as zf:
+            zf.writestr('page1.jpg', b'1' * 1000)
+            zf.writestr('page2.jpg', b'2' * 1000, zipfile.ZIP_DEFLATED)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertIsNone(zf.testzip())
+            return dict((name, zf.read(name)) for name in zf.namelist())
+
+    def test_add(self):
+        self.assertEqual(replace_member(self.path, 'notes', b'one'), 0)
+        self.assertEqual(self.read(), {'page1.jpg': b'1' * 1000,
+                                       'page2.jpg': b'2' * 1000,
+                                       'notes': b'one'})
+
+    def test_replace_last_member(self):
+        replace_member(self.path, 'notes', b'one')
+        size = os.path.getsize(self.path)
+        # the old copy is at the end, so it is written over
+        self.assertEqual(replace_member(self.path, 'notes', b'two'), 0)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertEqual(self.read()['notes'], b'two')
+
+    def test_replace_earlier_member(self):
+        replace_member(self.path, 'notes', b'one')
+        unused = replace_member(self.path, 'page1.jpg', b'new')
+        # the old page is left behind, headers included
+        self.assertGreater(unused, 1000)
+        contents = self.read()
+        self.assertEqual(contents['page1.jpg'], b'new')
+        self.assertEqual(contents['page2.jpg'], b'2' * 1000)
+        self.assertEqual(contents['notes'], b'one')
+        self.assertEqual(len(contents), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import hashlib
+import logging
+import shutil
+
+from gi.repository import GdkPixbuf
+from gi.repository import GLib
+
+from imageloader import load_pixbuf, probe_image_size
+from pagelayout import get_fit_size
+
+_logger = logging.getLogger('view-slides')
+
+THUMBNAIL_WIDTH = 96
+THUMBNAIL_HEIGHT = 128
+# Archives whose thumbnails are kept on disk, least recently opened
+# ones are removed first.
+MAX_CACHED_ARCHIVES = 20
+
+
+def make_thumbnail(fileobj, image_size=None):
+    "Decode an open image straight to thumbnail size"
+    if image_size is None:
+        image_size = probe_image_size(fileobj)
+        fileobj.seek(0)
+    if image_size is None:
+        pixbuf = load_pixbuf(fileobj)
+        width, height = get_fit_size(
+            pixbuf.get_width(), pixbuf.get_height(),
+            THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+        return pixbuf.scale_simple(
+            width, height, GdkPixbuf.InterpType.BILINEAR)
+    image_width, image_height = image_size
+    width, height = get_fit_size(
+        image_width, image_height, THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+    return load_pixbuf(fileobj, width, height)
+
+
+def make_placeholder():
+    "Blank thumbnail shown until the real one is ready"
+    pixbuf = GdkPixbuf.Pixbuf.new(
+        GdkPixbuf.Colorspace.RGB, False, 8,
+        THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+    pixbuf.fill(0xddddddff)
+    return pixbuf
+
+
+class ThumbnailCache():
+    """Page thumbnails kept on disk between sessions.
+
+    Thumbnails are stored in one directory per archive, named after the
+    archive fingerprint, so reopening a book finds them again without
+    decoding any pages.  Loading and saving may be done from worker
+    threads."""
+
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+
+    def open_archive(self, fingerprint):
+        "Get the cache ready for an archive and mark it recently used"
+        if fingerprint is None:
+            return
+        archive_dir = os.path.join(self._cache_dir, fingerprint)
+        try:
+            if os.path.exists(archive_dir):
+                os.utime(archive_dir, None)
+            else:
+                os.makedirs(archive_dir)
+            self._prune()
+        except OSError as err:
+            _logger.warning('Cannot use thumbnail cache: %s', err)
+
+    def _get_path(self, fingerprint, name):
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, fingerprint, digest + '.png')
+
+    def load(self, fingerprint, name):
+        if fingerprint is None:
+            return None
+        path = self._get_path(fingerprint, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            return GdkPixbuf.Pixbuf.new_from_file(path)
+        except GLib.Error:
+            return None
+
+    def save(self, fingerprint, name, pixbuf):
+        if fingerprint is None:
+            return
+        path = self._get_path(fingerprint, name)
+        temp_path = path + '.tmp'
+        try:
+            pixbuf.savev(temp_path, 'png', [], [])
+            os.rename(temp_path, path)
+        except (GLib.Error, OSError) as err:
+            _logger.warning('Cannot save thumbnail for %s: %s', name, err)
+
+    def _prune(self):
+        archive_dirs = []
+        for fingerprint in os.listdir(self._cache_dir):
+            path = os.path.join(self._cache_dir, fingerprint)
+            archive_dirs.append((os.path.getmtime(path), path))
+        archive_dirs.sort()
+        for mtime, path in archive_dirs[:-MAX_CACHED_ARCHIVES]:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,108 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+from gi.repository import Gtk
+from gi.repository import Gdk
+from gi.repository import GdkPixbuf
+
+# Height in pixels of one scaled strip of the page
+TILE_HEIGHT = 256
+# Tiles kept above and below the visible ones
+TILE_MARGIN = 2
+
+
+class TiledImage(Gtk.DrawingArea):
+    """Show a tall page scaled one horizontal tile at a time.
+
+    Only the tiles in view and a small margin around them are scaled,
+    and tiles are dropped again as they scroll out of range, so a long
+    strip never needs one pixbuf the size of the whole scaled page."""
+
+    def __init__(self, vadjustment):
+        Gtk.DrawingArea.__init__(self)
+        self._vadjustment = vadjustment
+        self._source = None
+        self._width = 0
+        self._height = 0
+        self._tiles = {}
+        self.connect('draw', self.__draw_cb)
+        vadjustment.connect('value-changed', self.__value_changed_cb)
+
+    def set_source(self, pixbuf, width, height):
+        """Show pixbuf scaled to width x height.
+
+        The pixbuf may already be that size, in which case tiles are
+        just views into it."""
+        self._source = pixbuf
+        self._width = width
+        self._height = height
+        self._tiles.clear()
+        self.set_size_request(width, height)
+        self.queue_draw()
+
+    def clear(self):
+        self._source = None
+        self._tiles.clear()
+        self.set_size_request(-1, -1)
+
+    def _get_tile_range(self, top, bottom):
+        count = (self._height + TILE_HEIGHT - 1) // TILE_HEIGHT
+        first = max(0, int(top) // TILE_HEIGHT - TILE_MARGIN)
+        last = min(count - 1, int(bottom) // TILE_HEIGHT + TILE_MARGIN)
+        return range(first, last + 1)
+
+    def _get_tile(self, index):
+        tile = self._tiles.get(index)
+        if tile is not None:
+            return tile
+        y = index * TILE_HEIGHT
+        height = min(TILE_HEIGHT, self._height - y)
+        source_width = self._source.get_width()
+        source_height = self._source.get_height()
+        if source_width == self._width and source_height == self._height:
+            tile = self._source.new_subpixbuf(0, y, self._width, height)
+        else:
+            tile = GdkPixbuf.Pixbuf.new(
+                GdkPixbuf.Colorspace.RGB, self._source.get_has_alpha(), 8,
+                self._width, height)
+            self._source.scale(
+                tile, 0, 0, self._width, height, 0, -y,
+                float(self._width) / source_width,
+                float(self._height) / source_height,
+                GdkPixbuf.InterpType.BILINEAR)
+        self._tiles[index] = tile
+        return tile
+
+    def __draw_cb(self, widget, cr):
+        if self._source is None:
+            return False
+        x1, y1, x2, y2 = cr.clip_extents()
+        for index in self._get_tile_range(y1, y2):
+            tile = self._get_tile(index)
+            y = index * TILE_HEIGHT
+            Gdk.cairo_set_source_pixbuf(cr, tile, 0, y)
+            cr.rectangle(0, y, tile.get_width(), tile.get_height())
+            cr.fill()
+        return True
+
+    def __value_changed_cb(self, adjustment):
+        if not self._tiles:
+            return
+        top = adjustment.get_value()
+        keep = self._get_tile_range(top, top + adjustment.get_page_size())
+        for index in list(self._tiles.keys()):
+            if index not in keep:
+                del self._tiles[index]
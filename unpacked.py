@@ -0,0 +1,157 @@
+# Copyright (C) 2026 Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import json
+import logging
+import shutil
+import zipfile
+
+from archive import ArchiveIndex, DirectoryArchive, open_archive, \
+    COPY_BLOCK_SIZE
+
+_logger = logging.getLogger('view-slides')
+
+# Total bytes of unpacked archives kept on disk
+DEFAULT_UNPACKED_SIZE = 256 * 1024 * 1024
+
+# Archives opened once that are remembered, so a second open can be
+# recognised
+MAX_SEEN_ARCHIVES = 100
+
+_MANIFEST = 'manifest.json'
+
+
+class UnpackedCache():
+    """Archives unpacked to plain files for books that are read often.
+
+    An archive is unpacked the second time it is opened, into a
+    directory named after its fingerprint.  Opening it after that reads
+    the pages straight from those files, without parsing or
+    decompressing the archive.  Only the pages are unpacked, the
+    annotations stored with them change between sessions and are read
+    from the archive itself.  The least recently opened archives are
+    removed when the cache grows past max_bytes.  unpack() may be called
+    from a worker thread."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_UNPACKED_SIZE):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+
+    def _get_dir(self, fingerprint):
+        return os.path.join(self._cache_dir, fingerprint)
+
+    def _get_seen_path(self, fingerprint):
+        return os.path.join(self._cache_dir, fingerprint + '.seen')
+
+    def open_archive(self, fingerprint):
+        "The unpacked archive with this fingerprint, or None"
+        if fingerprint is None:
+            return None
+        archive_dir = self._get_dir(fingerprint)
+        manifest = os.path.join(archive_dir, _MANIFEST)
+        if not os.path.exists(manifest):
+            return None
+        try:
+            with open(manifest) as f:
+                members = json.load(f)
+            os.utime(archive_dir, None)
+        except (OSError, ValueError) as err:
+            _logger.warning('Cannot read unpacked archive: %s', err)
+            return None
+        return DirectoryArchive(archive_dir, members, fingerprint)
+
+    def should_unpack(self, fingerprint):
+        """Note that an archive was opened.
+
+        Returns True when it has been opened before and is worth
+        unpacking."""
+        if fingerprint is None:
+            return False
+        seen_path = self._get_seen_path(fingerprint)
+        if os.path.exists(seen_path):
+            return True
+        try:
+            if not os.path.exists(self._cache_dir):
+                os.makedirs(self._cache_dir)
+            open(seen_path, 'w').close()
+        except OSError as err:
+            _logger.warning('Cannot use unpacked cache: %s', err)
+        return False
+
+    def unpack(self, fingerprint, path):
+        "Unpack the archive at path into the cache"
+        archive_dir = self._get_dir(fingerprint)
+        temp_dir = archive_dir + '.tmp'
+        archive = None
+        try:
+            archive = open_archive(path)
+            if archive is None:
+                return
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            os.makedirs(temp_dir)
+            members = []
+            index = ArchiveIndex(archive.infolist())
+            for number, info in enumerate(index.get_infos()):
+                filename = str(number)
+                with archive.open(info) as source, \
+                        open(os.path.join(temp_dir, filename), 'wb') as f:
+                    shutil.copyfileobj(source, f, COPY_BLOCK_SIZE)
+                members.append([info.filename, filename, info.file_size])
+            with open(os.path.join(temp_dir, _MANIFEST), 'w') as f:
+                json.dump(members, f)
+            shutil.rmtree(archive_dir, ignore_errors=True)
+            os.rename(temp_dir, archive_dir)
+            os.remove(self._get_seen_path(fingerprint))
+        except (OSError, zipfile.BadZipFile) as err:
+            _logger.warning('Cannot unpack %s: %s', path, err)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+        finally:
+            if archive is not None:
+                archive.close()
+        try:
+            self._prune()
+        except OSError as err:
+            _logger.warning('Cannot prune unpacked cache: %s', err)
+
+    def _get_size(self, archive_dir):
+        size = 0
+        for name in os.listdir(archive_dir):
+            size += os.path.getsize(os.path.join(archive_dir, name))
+        return size
+
+    def _prune(self):
+        archive_dirs = []
+        seen = []
+        for name in os.listdir(self._cache_dir):
+            path = os.path.join(self._cache_dir, name)
+            if name.endswith('.seen'):
+                seen.append((os.path.getmtime(path), path))
+            elif os.path.isdir(path) and not name.endswith('.tmp'):
+                archive_dirs.append((os.path.getmtime(path), path))
+        # keep the most recently opened archives that fit
+        archive_dirs.sort(reverse=True)
+        total = 0
+        for mtime, path in archive_dirs:
+            size = self._get_size(path)
+            if total + size > self._max_bytes:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                total += size
+        seen.sort(reverse=True)
+        for mtime, path in seen[MAX_SEEN_ARCHIVES:]:
+            os.remove(path)
@@ -18,6 +18,8 @@
 import os
 import logging
 import time
+import shutil
+import threading
 import zipfile
 from zipfile import BadZipfile
 
@@ -26,7 +28,6 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 from gi.repository import GdkPixbuf
 from gi.repository import Gdk
-import pygame
 import re
 
 from sugar3.activity import activity
@@ -41,6 +42,7 @@ from readtoolbar import SlidesToolbar
 from sugar3.graphics.toolbutton import ToolButton
 from sugar3.graphics.menuitem import MenuItem
 from sugar3.graphics.toggletoolbutton import ToggleToolButton
+from sugar3.graphics import iconentry
 
 from readsidebar import Sidebar
 from gettext import gettext as _
@@ -49,8 +51,21 @@ from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import TelepathyGLib
 import pickle
-from decimal import *
 import xopower
+from imageloader import load_pixbuf, get_image_format, probe_image_size
+from pagecache import PixbufCache
+from prefetch import PagePrefetcher
+from pagelayout import PageLayout, get_scaled_size
+from tiledview import TiledImage
+from thumbnails import ThumbnailCache, make_thumbnail, make_placeholder, \
+    THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+from archive import ArchiveIndex, replace_member, copy_member, \
+    open_archive, convert_to_zip, get_fingerprint
+from unpacked import UnpackedCache
+from slideimport import SlideImporter
+from bookmarks import BookmarkIndex
+from annotationlog import AnnotationLog, read_pickled_annotations
+from noteindex import NoteIndex
 from collabwrapper import CollabWrapper
 
 _TOOLBAR_READ = 1
@@ -58,6 +73,39 @@ _TOOLBAR_SLIDES = 3
 COLUMN_IMAGE = 0
 COLUMN_PATH = 1
 COLUMN_OLD_NAME = 1
+COLUMN_THUMBNAIL = 0
+COLUMN_PAGE_NUMBER = 1
+# Bytes of scaled page images kept around for flipping back and forth
+PAGE_CACHE_SIZE = 32 * 1024 * 1024
+# Pages that take longer than this many seconds to decode are first
+# shown as a quick preview at 1/PREVIEW_SHRINK of the size.
+PREVIEW_LATENCY = 0.1
+PREVIEW_SHRINK = 4
+# Milliseconds the page area must keep its size before the page is
+# rendered again, and pixels left around the page inside it.
+RESIZE_DELAY = 200
+VIEW_BORDER = 4
+# Archives are compacted when replaced annotations leave behind more
+# than this many unused bytes and this fraction of the file.
+COMPACT_MIN_UNUSED = 1024 * 1024
+COMPACT_RATIO = 0.25
+# Pages listed for a note search and characters of each note shown
+MAX_SEARCH_RESULTS = 20
+SEARCH_SNIPPET_LENGTH = 40
+# Seconds edits to the annotations are gathered before they are
+# autosaved together
+AUTOSAVE_INTERVAL = 30
+# Member of the archive holding the annotation log
+ANNOTATIONS_MEMBER = 'annotations.jsonl'
+# Member older versions kept the annotations in
+OLD_ANNOTATIONS_MEMBER = 'annotations.pkl'
+# Pages added to the page list at a time while a document opens
+PAGE_LIST_BATCH = 200
+# Thumbnails queued when the page overview cannot tell what is in view
+THUMBNAIL_BATCH = 10
+# Pages zoomed to width that are more than this many screens tall are
+# drawn in tiles rather than scaled as a whole.
+TILED_PAGE_HEIGHT = 3
 
 _logger = logging.getLogger('view-slides')
 
@@ -79,73 +127,111 @@ class JobjectWrapper():
         else:
             return self.__file_path
 
+    def get_uid(self):
+        if self.__jobject is not None:
+            return self.__jobject.object_id
+        return None
+
+    def get_timestamp(self):
+        if self.__jobject is not None:
+            return self.__jobject.metadata.get('timestamp', '')
+        return ''
+
 
 class Annotations():
+    """The title, notes and bookmarks of a document.
+
+    They are kept in an AnnotationLog, and the note of a page is only
+    read from it when the page is shown."""
 
-    def __init__(self, pickle_file_name):
+    def __init__(self, log_file_name):
         self.title = ''
-        self.notes = {0: ''}
-        self.bookmarks = []
-        self.pickle_file_name = pickle_file_name
+        self.notes = {}
+        self.bookmarks = BookmarkIndex()
+        self.log = AnnotationLog(log_file_name)
+        self._note_index = None
 
     def get_title(self):
         return self.title
 
     def set_title(self, title):
-        self.title = title
+        if title != self.title:
+            self.title = title
+            self.log.set_title(title)
 
     def get_notes(self):
-        return self.notes
+        for page in self.log.get_note_pages():
+            self.get_note(page)
+        return dict((page, text) for page, text in self.notes.items()
+                    if text != '')
 
     def get_note(self, page):
-        try:
-            return self.notes[page]
-        except KeyError:
-            return ''
+        text = self.notes.get(page)
+        if text is None:
+            text = self.log.read_note(page)
+            self.notes[page] = text
+        return text
 
     def add_note(self, page, text):
-        status = False
-        if self.get_note(page) != text:
-            status = True
+        if self.get_note(page) == text:
+            return False
         self.notes[page] = text
-        if text == '':
-            del self.notes[page]
-        return status
+        self.log.set_note(page, text)
+        if self._note_index is not None:
+            self._note_index.set_note(page, text)
+        return True
+
+    def search_notes(self, query):
+        "Pages whose notes have all the words in query"
+        if self._note_index is None:
+            # built on the first search, then kept up to date
+            self._note_index = NoteIndex()
+            for page, text in self.get_notes().items():
+                self._note_index.set_note(page, text)
+        return self._note_index.search(query)
 
     def is_bookmarked(self, page):
-        bookmark = self.bookmarks.count(page)
-        if bookmark > 0:
-            return True
-        else:
-            return False
+        return page in self.bookmarks
 
     def add_bookmark(self, page):
-        self.bookmarks.append(page)
+        if page not in self.bookmarks:
+            self.bookmarks.add(page)
+            self.log.set_bookmark(page, True)
 
     def remove_bookmark(self, page):
-        try:
-            self.bookmarks.remove(page)
-        except ValueError:
+        if self.bookmarks.remove(page):
+            self.log.set_bookmark(page, False)
+        else:
             print('page already not bookmarked', page)
 
     def get_bookmarks(self):
-        self.bookmarks.sort()
-        return self.bookmarks
+        return self.bookmarks.get_pages()
+
+    def get_previous_bookmark(self, page):
+        return self.bookmarks.get_previous(page)
+
+    def get_next_bookmark(self, page):
+        return self.bookmarks.get_next(page)
+
+    def import_pickle(self, data):
+        "Start the log from the annotations.pkl of older versions"
+        title, bookmarks, notes = read_pickled_annotations(data)
+        bookmarks = [page for page in bookmarks if isinstance(page, int)]
+        notes = dict((page, text) for page, text in notes.items()
+                     if isinstance(page, int) and isinstance(text, str))
+        self.log.write(title, bookmarks, notes)
 
     def restore(self):
-        if os.path.exists(self.pickle_file_name):
-            pickle_input = open(self.pickle_file_name, 'rb')
-            self.title = pickle.load(pickle_input)
-            self.bookmarks = pickle.load(pickle_input)
-            self.notes = pickle.load(pickle_input)
-            pickle_input.close()
+        self.title, bookmarks = self.log.load()
+        self.bookmarks = BookmarkIndex(bookmarks)
+        self.notes = {}
+        self._note_index = None
+
+    def is_dirty(self):
+        return self.log.is_dirty()
 
     def save(self):
-        pickle_output = open(self.pickle_file_name, 'wb')
-        pickle.dump(self.title, pickle_output)
-        pickle.dump(self.bookmarks, pickle_output)
-        pickle.dump(self.notes, pickle_output)
-        pickle_output.close()
+        self.log.save()
 
 
 class ViewSlidesActivity(activity.Activity):
@@ -163,9 +249,38 @@ class ViewSlidesActivity(activity.Activity):
         self._object_id = handle.object_id
         self.zoom_image_to_fit = True
         self.total_pages = 0
+        self.index = ArchiveIndex([])
+        self.reader = None
+        # bumped whenever the document changes, so work still in
+        # flight for an older one is dropped
+        self._open_generation = 0
+        self._rows_loaded = 0
+        self._sizes_loaded = 0
+        self.page_sizes = {}
+        self.page_layout = PageLayout()
+        self.fingerprint = None
+        # the annotations of the document are only saved once they have
+        # been read from it, or a save could replace them with nothing
+        self._annotations_restored = False
+        self.thumbnail_cache = ThumbnailCache(os.path.join(
+            self.get_activity_root(), 'data', 'thumbnails'))
+        self.unpacked_cache = UnpackedCache(os.path.join(
+            self.get_activity_root(), 'data', 'unpacked'))
+        self.thumbnailer = PagePrefetcher(
+            self.render_thumbnail, self._thumbnail_done_cb, workers=1)
+        self._thumbnail_placeholder = make_placeholder()
+        self._thumbnails_loaded = set()
+        self.page_cache = PixbufCache(PAGE_CACHE_SIZE)
+        # the decoded source of the last tall page shown in tiles, kept
+        # apart from the page cache since it is often bigger than all of
+        # it, as (filename, width, height, pixbuf)
+        self._tiled_source = None
+        self.prefetcher = PagePrefetcher(
+            self.render_page, self._page_prefetched_cb)
+        self.progressive_render = True
+        self._preview_key = None
         self.buddies = {}
 
-        self.connect("draw", self.__draw_cb)
         self.connect("delete-event", self.__delete_event_cb)
         self.object_id = handle.object_id
         self.create_new_toolbar()
@@ -173,10 +288,20 @@ class ViewSlidesActivity(activity.Activity):
         self.scrolled.set_policy(
             Gtk.PolicyType.NEVER,
             Gtk.PolicyType.AUTOMATIC)
+        self._view_size = None
+        self._allocated_view_size = None
+        self._resize_timeout_id = 0
+        self.scrolled.connect('size-allocate',
+                              self.__scrolled_size_allocate_cb)
         self.image = Gtk.Image()
+        self.tiled_image = TiledImage(self.scrolled.get_vadjustment())
+        image_box = Gtk.VBox()
+        image_box.pack_start(self.image, True, True, 0)
+        image_box.pack_start(self.tiled_image, False, False, 0)
         self.eventbox = Gtk.EventBox()
-        self.eventbox.add(self.image)
+        self.eventbox.add(image_box)
         self.image.show()
+        image_box.show()
         self.eventbox.show()
         self.scrolled.add_with_viewport(self.eventbox)
         self.eventbox.set_events(
@@ -196,10 +321,10 @@ class ViewSlidesActivity(activity.Activity):
 
         self.ls_left = Gtk.ListStore(
             GObject.TYPE_STRING, GObject.TYPE_STRING)
-        tv_left = Gtk.TreeView(self.ls_left)
-        tv_left.set_rules_hint(True)
-        tv_left.set_search_column(COLUMN_IMAGE)
-        selection_left = tv_left.get_selection()
+        self.tv_left = Gtk.TreeView(self.ls_left)
+        self.tv_left.set_rules_hint(True)
+        self.tv_left.set_search_column(COLUMN_IMAGE)
+        selection_left = self.tv_left.get_selection()
         selection_left.set_mode(Gtk.SelectionMode.SINGLE)
         selection_left.connect("changed", self.selection_left_cb)
         renderer = Gtk.CellRendererText()
@@ -208,32 +333,32 @@ class ViewSlidesActivity(activity.Activity):
         col_left.set_sort_column_id(COLUMN_IMAGE)
         renderer.set_property('editable', True)
         renderer.connect('edited', self.col_left_edited_cb, self.ls_left)
-        tv_left.append_column(col_left)
+        self.tv_left.append_column(col_left)
 
         self.list_scroller_left = Gtk.ScrolledWindow()
         self.list_scroller_left.set_policy(
             Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.list_scroller_left.add(tv_left)
+        self.list_scroller_left.add(self.tv_left)
 
         self.ls_right = Gtk.ListStore(
             GObject.TYPE_STRING, GObject.TYPE_PYOBJECT)
-        tv_right = Gtk.TreeView(self.ls_right)
-        tv_right.set_rules_hint(True)
-        tv_right.set_search_column(COLUMN_IMAGE)
-        selection_right = tv_right.get_selection()
+        self.tv_right = Gtk.TreeView(self.ls_right)
+        self.tv_right.set_rules_hint(True)
+        self.tv_right.set_search_column(COLUMN_IMAGE)
+        selection_right = self.tv_right.get_selection()
         selection_right.set_mode(Gtk.SelectionMode.SINGLE)
         selection_right.connect("changed", self.selection_right_cb)
         renderer = Gtk.CellRendererText()
         self.col_right = Gtk.TreeViewColumn(
             _('Available Images'), renderer, text=COLUMN_IMAGE)
         self.col_right.set_sort_column_id(COLUMN_IMAGE)
-        tv_right.append_column(self.col_right)
+        self.tv_right.append_column(self.col_right)
 
         self.list_scroller_right = Gtk.ScrolledWindow(
             hadjustment=None, vadjustment=None)
         self.list_scroller_right.set_policy(
             Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.list_scroller_right.add(tv_right)
+        self.list_scroller_right.add(self.tv_right)
 
         self.hpane = Gtk.HPaned()
         self.hpane.add1(self.list_scroller_left)
@@ -241,9 +366,29 @@ class ViewSlidesActivity(activity.Activity):
         self.progressbar = Gtk.ProgressBar()
         self.progressbar.set_fraction(0.0)
 
+        self.thumbnail_store = Gtk.ListStore(
+            GdkPixbuf.Pixbuf, GObject.TYPE_STRING)
+        self.thumbnail_view = Gtk.IconView(model=self.thumbnail_store)
+        self.thumbnail_view.set_pixbuf_column(COLUMN_THUMBNAIL)
+        self.thumbnail_view.set_text_column(COLUMN_PAGE_NUMBER)
+        self.thumbnail_view.set_item_width(THUMBNAIL_WIDTH)
+        self.thumbnail_view.set_selection_mode(Gtk.SelectionMode.SINGLE)
+        self.thumbnail_view.set_activate_on_single_click(True)
+        self.thumbnail_view.connect('item-activated',
+                                    self.__thumbnail_activated_cb)
+        self.thumbnail_view.show()
+        self.thumbnail_scroller = Gtk.ScrolledWindow()
+        self.thumbnail_scroller.set_policy(
+            Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.NEVER)
+        self.thumbnail_scroller.set_size_request(-1, THUMBNAIL_HEIGHT + 60)
+        self.thumbnail_scroller.add(self.thumbnail_view)
+        self.thumbnail_scroller.props.hadjustment.connect(
+            'value-changed', self.__thumbnails_scrolled_cb)
+
         vbox = Gtk.VBox()
         vbox.pack_start(self.progressbar, False, False, 10)
         vbox.pack_start(self.scrolled, True, True, 0)
+        vbox.pack_start(self.thumbnail_scroller, False, False, 0)
         vbox.pack_end(self.hpane, True, True, 0)
         vbox.pack_end(self.annotation_textview, False, False, 10)
 
@@ -254,9 +399,9 @@ class ViewSlidesActivity(activity.Activity):
         sidebar_hbox.show()
 
         self.scrolled.show()
-        tv_left.show()
+        self.tv_left.show()
         self.list_scroller_left.show()
-        tv_right.show()
+        self.tv_right.show()
         self.list_scroller_right.show()
         self.hpane.show()
         vbox.show()
@@ -269,19 +414,28 @@ class ViewSlidesActivity(activity.Activity):
             self.get_activity_root(),
             'instance',
             'viewslides-files')
+        # start with an empty slideshow, images are added as they are
+        # picked from the Journal table
+        zipfile.ZipFile(self.activity_zip, 'w').close()
+        self.importer = SlideImporter(os.path.join(
+            self.get_activity_root(), 'data', 'image-hashes.json'))
+        self.importer.open_archive(self.activity_zip)
         self.load_journal_table()
 
         self.page = 0
         self.temp_filename = ''
-        self.saved_screen_width = 0
         self.eventbox.grab_focus()
         self.cursor_visible = True
 
-        self.pickle_file_temp = os.path.join(
+        self.annotations_file_temp = os.path.join(
             self.get_activity_root(),
             'instance',
-            'pkl{}'.format(time.time()))
-        self.annotations = Annotations(self.pickle_file_temp)
+            'annotations{}'.format(time.time()))
+        self.annotations = Annotations(self.annotations_file_temp)
+        self.autosave_dir = os.path.join(
+            self.get_activity_root(), 'data', 'autosave')
+        self._autosave_id = 0
+        self._autosave_thread = None
 
         xopower.setup_idle_timeout()
         if xopower.service_activated:
@@ -406,6 +560,21 @@ class ViewSlidesActivity(activity.Activity):
         toolbar_box.toolbar.insert(bookmarkitem, -1)
         bookmarkitem.show_all()
 
+        search_item = Gtk.ToolItem()
+        self._search_entry = iconentry.IconEntry()
+        self._search_entry.set_icon_from_name(
+            iconentry.ICON_ENTRY_PRIMARY, 'system-search')
+        self._search_entry.add_clear_button()
+        self._search_entry.set_placeholder_text(_('Search notes'))
+        self._search_entry.set_width_chars(12)
+        self._search_entry.connect(
+            'activate', self.__search_entry_activate_cb)
+        search_item.add(self._search_entry)
+        self._search_entry.show()
+        toolbar_box.toolbar.insert(search_item, -1)
+        search_item.show()
+        self._search_menu = None
+
         spacer2 = Gtk.SeparatorToolItem()
         toolbar_box.toolbar.insert(spacer2, -1)
         spacer2.show()
@@ -424,6 +593,12 @@ class ViewSlidesActivity(activity.Activity):
         self._zoom_in.props.sensitive = True
         self._zoom_in.show()
 
+        self._show_thumbnails = ToggleToolButton('view-freeform')
+        self._show_thumbnails.set_tooltip(_('Page overview'))
+        self._show_thumbnails.connect('toggled', self._show_thumbnails_cb)
+        toolbar_box.toolbar.insert(self._show_thumbnails, -1)
+        self._show_thumbnails.show()
+
         self._fullscreen = ToolButton('view-fullscreen')
         self._fullscreen.set_tooltip(_('Fullscreen'))
         self._fullscreen.connect('clicked', self._fullscreen_cb)
@@ -473,6 +648,73 @@ class ViewSlidesActivity(activity.Activity):
     def _fullscreen_cb(self, button):
         self.emit('go-fullscreen')
 
+    def _show_thumbnails_cb(self, button):
+        if button.get_active():
+            self.thumbnail_scroller.show()
+            GLib.idle_add(self.update_thumbnails)
+        else:
+            self.thumbnail_scroller.hide()
+            self.thumbnailer.cancel()
+
+    def __thumbnails_scrolled_cb(self, adjustment):
+        self.update_thumbnails()
+
+    def __thumbnail_activated_cb(self, icon_view, path):
+        page = path.get_indices()[0]
+        self.capture_note()
+        self.set_current_page(page)
+        self.show_page(page)
+
+    def load_thumbnail_store(self):
+        "empty the page overview, pages are added as they are listed"
+        self.thumbnailer.cancel()
+        self.thumbnail_store.clear()
+        self._thumbnails_loaded = set()
+        self.thumbnail_view.set_columns(max(1, len(self.index)))
+        self.thumbnail_cache.open_archive(self.fingerprint)
+
+    def update_thumbnails(self):
+        "queue thumbnails for the pages in view in the page overview"
+        if not self.thumbnail_scroller.get_visible():
+            return False
+        first = 0
+        last = THUMBNAIL_BATCH
+        visible = self.thumbnail_view.get_visible_range()
+        if visible:
+            start_path, end_path = visible[-2:]
+            if start_path is not None and end_path is not None:
+                first = start_path.get_indices()[0]
+                last = end_path.get_indices()[0]
+        keys = []
+        for page in range(max(0, first - 2),
+                          min(len(self.thumbnail_store), last + 3)):
+            if page not in self._thumbnails_loaded:
+                keys.append((self.index.get_name(page), self.fingerprint))
+        self.thumbnailer.prefetch(keys)
+        return False
+
+    def render_thumbnail(self, key):
+        "load or make a page thumbnail, called on a worker thread"
+        filename, fingerprint = key
+        pixbuf = self.thumbnail_cache.load(fingerprint, filename)
+        if pixbuf is None:
+            reader = self.reader
+            index = self.index
+            if reader is None or fingerprint != self.fingerprint:
+                # queued for a document that is no longer open, do not
+                # store a page of another one under its fingerprint
+                return None
+            with reader.open(index.get_info(filename)) as f:
+                pixbuf = make_thumbnail(f, self.page_sizes.get(filename))
+            self.thumbnail_cache.save(fingerprint, filename, pixbuf)
+        return pixbuf
+
+    def _thumbnail_done_cb(self, key, pixbuf):
+        page = self.index.get_page(key[0])
+        if page is not None and page < len(self.thumbnail_store):
+            self.thumbnail_store[page][COLUMN_THUMBNAIL] = pixbuf
+            self._thumbnails_loaded.add(page)
+
     def __new_num_page_entry_insert_text_cb(
             self, entry, text, length, position):
         if not re.match('[0-9]', text):
@@ -491,6 +733,7 @@ class ViewSlidesActivity(activity.Activity):
         elif page < 0:
             page = 0
 
+        self.capture_note()
         self.set_current_page(page)
         self.show_page(page)
         entry.props.text = str(page + 1)
@@ -524,6 +767,35 @@ class ViewSlidesActivity(activity.Activity):
     def set_total_pages(self, pages):
         self.total_pages = pages
 
+    def __search_entry_activate_cb(self, entry):
+        "list the pages whose notes match in a menu under the entry"
+        self.capture_note()
+        pages = self.annotations.search_notes(entry.props.text)
+        if self._search_menu is not None:
+            self._search_menu.destroy()
+        self._search_menu = Gtk.Menu()
+        for page in pages[:MAX_SEARCH_RESULTS]:
+            note = self.annotations.get_note(page).strip().split('\n')[0]
+            if len(note) > SEARCH_SNIPPET_LENGTH:
+                note = note[:SEARCH_SNIPPET_LENGTH] + '...'
+            item = MenuItem(text_label=_('Page %d: %s') % (page + 1, note))
+            item.connect('activate', self.__search_result_activate_cb, page)
+            self._search_menu.append(item)
+        if not pages:
+            item = MenuItem(text_label=_('No matching notes'))
+            item.props.sensitive = False
+            self._search_menu.append(item)
+        self._search_menu.show_all()
+        self._search_menu.popup_at_widget(
+            entry, Gdk.Gravity.SOUTH_WEST, Gdk.Gravity.NORTH_WEST, None)
+
+    def __search_result_activate_cb(self, menuitem, page):
+        if page >= len(self.index):
+            return
+        self.capture_note()
+        self.set_current_page(page)
+        self.show_page(page)
+
     def prev_bookmark_activate_cb(self, menuitem):
         self.prev_bookmark()
 
@@ -542,13 +814,31 @@ class ViewSlidesActivity(activity.Activity):
         self.setToggleButtonState(
             self.bookmarker, state, self.bookmarker_handler_id)
 
+    def append_rows(self, view, store, rows):
+        """Add many rows to a list store at once.
+
+        The store is taken off its view and left unsorted while the rows
+        go in, so the view is neither redrawn nor the store resorted
+        after every row."""
+        sort_column, order = store.get_sort_column_id()
+        view.set_model(None)
+        if sort_column is not None:
+            store.set_sort_column_id(
+                Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID, order)
+        for row in rows:
+            store.append(row)
+        if sort_column is not None:
+            store.set_sort_column_id(sort_column, order)
+        view.set_model(store)
+
     def load_journal_table(self):
-        ds_objects, num_objects = datastore.find({'mime_type': ['image/jpeg', 'image/gif',
-            'image/tiff', 'image/png']}, properties=['uid', 'title', 'mime_type'])
-        self.ls_right.clear()
-        self.activity_zip = zipfile.ZipFile(self.activity_zip, 'w')
+        "List the images in the Journal, without copying any of them"
+        ds_objects, num_objects = datastore.find(
+            {'mime_type': ['image/jpeg', 'image/gif',
+                           'image/tiff', 'image/png']},
+            properties=['uid', 'title', 'mime_type', 'timestamp'])
+        rows = []
         for i in range(0, num_objects):
-            selected_iter = self.ls_right.append()
             title = ds_objects[i].metadata['title']
             mime_type = ds_objects[i].metadata['mime_type']
             if mime_type == 'image/jpeg' and not title.endswith('.jpg') and not title.endswith(
@@ -563,29 +853,18 @@ class ViewSlidesActivity(activity.Activity):
             if mime_type == 'image/tiff' and not title.endswith(
                     '.tiff') and not title.endswith('.TIFF'):
                 title = title + '.tiff'
-            self.ls_right.set(selected_iter, COLUMN_IMAGE, title)
             jobject_wrapper = JobjectWrapper()
             jobject_wrapper.set_jobject(ds_objects[i])
-            self.ls_right.set(selected_iter, COLUMN_PATH, jobject_wrapper)
-
-            if title not in self.activity_zip.namelist():
-                self.activity_zip.write(ds_objects[i].get_file_path(), title)
-
-        self.activity_zip.close()
+            rows.append([title, jobject_wrapper])
+        # in the order the store sorts them, so sorting is one pass
+        rows.sort(key=lambda row: row[COLUMN_IMAGE])
+        self.tv_right.set_model(None)
+        self.ls_right.clear()
         self.ls_right.set_sort_column_id(COLUMN_IMAGE, Gtk.SortType.ASCENDING)
+        self.append_rows(self.tv_right, self.ls_right, rows)
 
     def reload_journal_table(self):
-        if os.path.exists(self.activity_zip.filename) and zipfile.is_zipfile(self.activity_zip):
-            zf = zipfile.ZipFile(self.activity_zip, 'r')
-            for filename in zf.namelist():
-                selected_iter = self.ls_right.append()
-                jobject_wrapper = JobjectWrapper()
-                jobject_wrapper.set_file_path(
-                    os.path.abspath(self.activity_zip.filename))
-                self.ls_right.set(selected_iter, COLUMN_IMAGE, filename)
-                self.ls_right.set(selected_iter, COLUMN_PATH, jobject_wrapper)
-        else:
-            self.load_journal_table()
+        self.load_journal_table()
 
     def col_left_edited_cb(self, cell, path, new_text, user_data):
         liststore = user_data
@@ -642,13 +921,18 @@ class ViewSlidesActivity(activity.Activity):
         if self.selected_journal_entry is None:
             return
         selected_file = self.selected_journal_entry.get_file_path()
-        arcname = self.selected_title
-        if self.check_for_duplicates(arcname):
+        # only images added to the slideshow are copied into it, and
+        # the same image is stored once whatever it is called
+        arcname, added = self.importer.add(
+            self.selected_journal_entry.get_uid(),
+            self.selected_journal_entry.get_timestamp(),
+            selected_file, self.selected_title)
+        if not added and self.check_for_duplicates(arcname):
             self._alert(
-                "Duplicate Filename",
-                'File ' +
-                str(arcname) +
-                ' already exists in slideshow!')
+                "Duplicate Image",
+                'Image ' +
+                str(self.selected_title) +
+                ' already in slideshow as ' + str(arcname) + '!')
             return
 
         selected_iter = self.ls_left.append()
@@ -697,27 +981,100 @@ class ViewSlidesActivity(activity.Activity):
                 return True
         return False
 
-    def final_rewrite_zip(self):
+    def save_annotations(self):
+        """Store the annotations in the archive.
+
+        Only the annotations entry and the central directory are
+        written.  The archive is rewritten in full only when replaced
+        entries have left too much unused space behind."""
         if not self.annotations_dirty:
             return
+        with open(self.annotations_file_temp, 'rb') as f:
+            unused = replace_member(
+                self.activity_zip, ANNOTATIONS_MEMBER, f.read())
+        if unused > COMPACT_MIN_UNUSED and \
+                unused > os.path.getsize(self.activity_zip) * COMPACT_RATIO:
+            self.final_rewrite_zip()
+
+    def get_document_id(self):
+        "the Journal entry being viewed, or this activity if it has none"
+        if self._jobject is not None and self._jobject.object_id:
+            return self._jobject.object_id
+        return self.get_id()
+
+    def get_autosave_path(self):
+        """where annotations of the open document are autosaved.
+
+        Documents with the same pages share a fingerprint, so the path
+        also names the Journal entry, and a copy is only taken up by the
+        document it was made from."""
+        if self.fingerprint is None:
+            return None
+        return os.path.join(
+            self.autosave_dir,
+            '{}-{}.jsonl'.format(self.get_document_id(), self.fingerprint))
+
+    def schedule_autosave(self):
+        "save the annotations in a while, along with any other edits"
+        if not self._autosave_id:
+            self._autosave_id = GLib.timeout_add_seconds(
+                AUTOSAVE_INTERVAL, self.__autosave_timeout_cb)
+
+    def __autosave_timeout_cb(self):
+        self._autosave_id = 0
+        self.capture_note()
+        if self._autosave_thread is not None and \
+                self._autosave_thread.is_alive():
+            # the last autosave is still being written
+            self.schedule_autosave()
+            return False
+        autosave_path = self.get_autosave_path()
+        if autosave_path is None or not self._annotations_restored or \
+                not self.annotations.is_dirty():
+            return False
+        self._autosave_thread = threading.Thread(
+            target=self.autosave, args=(autosave_path,))
+        self._autosave_thread.daemon = True
+        self._autosave_thread.start()
+        return False
+
+    def autosave(self, autosave_path):
+        """write the annotations to the log and a recovery copy.
+
+        This is called on a worker thread.  The copy replaces the last
+        one in a single rename, so a crash leaves one or the other."""
+        try:
+            if not os.path.exists(self.autosave_dir):
+                os.makedirs(self.autosave_dir)
+            self.annotations.save()
+            self.annotations.log.snapshot(autosave_path)
+        except OSError as err:
+            _logger.warning('Cannot autosave annotations: %s', err)
+
+    def wait_for_autosave(self):
+        if self._autosave_thread is not None:
+            self._autosave_thread.join()
+            self._autosave_thread = None
 
+    def remove_autosave(self):
+        "forget the recovery copy once the annotations are in the archive"
+        autosave_path = self.get_autosave_path()
+        if autosave_path is not None and os.path.exists(autosave_path):
+            os.remove(autosave_path)
+
+    def final_rewrite_zip(self):
+        "Compact the archive by copying what is in use into a new one"
         new_zipfile = os.path.join(self.get_activity_root(), 'instance',
                                    'rewrite{}'.format(time.time()))
         print(self.activity_zip, new_zipfile)
         zf_new = zipfile.ZipFile(new_zipfile, 'w')
         zf_old = zipfile.ZipFile(self.activity_zip, 'r')
-        image_files = zf_old.namelist()
-        i = 0
-        while (i < len(image_files)):
-            if (image_files[i] != 'annotations.pkl'):
-                self.save_extracted_file(zf_old, image_files[i])
-                outfn = self.make_new_filename(image_files[i])
-                fname = os.path.join(
-                    self.get_activity_root(), 'instance', outfn)
-                zf_new.write(fname.encode("utf-8"), outfn.encode("utf-8"))
-                os.remove(fname)
-            i = i + 1
-        zf_new.write(self.pickle_file_temp, 'annotations.pkl')
+        for info in zf_old.infolist():
+            # the annotations are written again below
+            if info.filename in (ANNOTATIONS_MEMBER, OLD_ANNOTATIONS_MEMBER):
+                continue
+            copy_member(zf_old, info, zf_new)
+        zf_new.write(self.annotations_file_temp, ANNOTATIONS_MEMBER)
 
         zf_old.close()
         zf_new.close()
@@ -732,11 +1089,11 @@ class ViewSlidesActivity(activity.Activity):
 
     def zoom_to_width(self):
         self.zoom_image_to_fit = False
-        self.show_page(self.page)
+        self.redraw_page(self.page)
 
     def zoom_to_fit(self):
         self.zoom_image_to_fit = True
-        self.show_page(self.page)
+        self.redraw_page(self.page)
 
     def __key_press_event_cb(self, widget, event):
         "Respond when the user presses Escape or one of the arrow keys"
@@ -778,6 +1135,7 @@ class ViewSlidesActivity(activity.Activity):
             self.annotations.remove_bookmark(self.page)
         self.show_bookmark_state(self.page)
         self.annotations_dirty = True
+        self.schedule_autosave()
 
     def show_bookmark_state(self, page):
         bookmark = self.annotations.is_bookmarked(page)
@@ -789,50 +1147,20 @@ class ViewSlidesActivity(activity.Activity):
             self.update_bookmark_button(False)
 
     def prev_bookmark(self):
-        textbuffer = self.annotation_textview.get_buffer()
-        if self.annotations.add_note(
-            self.page,
-            textbuffer.get_text(
-                textbuffer.get_start_iter(),
-                textbuffer.get_end_iter(),
-                include_hidden_chars=True)):
-            self.annotations_dirty = True
-        bookmarks = self.annotations.get_bookmarks()
-        count = len(bookmarks) - 1
-        while count >= 0:
-            if bookmarks[count] < self.page:
-                self.page = bookmarks[count]
-                self.show_page(self.page)
-                self.set_current_page(self.page)
-                return
-            count = count - 1
-        # if we're before the first bookmark wrap to the last.
-        if len(bookmarks) > 0:
-            self.page = bookmarks[len(bookmarks) - 1]
+        self.capture_note()
+        # before the first bookmark this wraps to the last.
+        page = self.annotations.get_previous_bookmark(self.page)
+        if page is not None:
+            self.page = page
             self.show_page(self.page)
             self.set_current_page(self.page)
 
     def next_bookmark(self):
-        textbuffer = self.annotation_textview.get_buffer()
-        if self.annotations.add_note(
-            self.page,
-            textbuffer.get_text(
-                textbuffer.get_start_iter(),
-                textbuffer.get_end_iter(),
-                include_hidden_chars=True)):
-            self.annotations_dirty = True
-        bookmarks = self.annotations.get_bookmarks()
-        count = 0
-        while count < len(bookmarks):
-            if bookmarks[count] > self.page:
-                self.page = bookmarks[count]
-                self.show_page(self.page)
-                self.set_current_page(self.page)
-                return
-            count = count + 1
-        # if we're after the last bookmark wrap to the first.
-        if len(bookmarks) > 0:
-            self.page = bookmarks[0]
+        self.capture_note()
+        # after the last bookmark this wraps to the first.
+        page = self.annotations.get_next_bookmark(self.page)
+        if page is not None:
+            self.page = page
             self.show_page(self.page)
             self.set_current_page(self.page)
 
@@ -861,194 +1189,370 @@ class ViewSlidesActivity(activity.Activity):
             v_adjustment.set_value(new_value)
 
     def previous_page(self):
-        textbuffer = self.annotation_textview.get_buffer()
-        if self.annotations.add_note(
-            self.page,
-            textbuffer.get_text(
-                textbuffer.get_start_iter(),
-                textbuffer.get_end_iter(),
-                include_hidden_chars=True)):
-            self.annotations_dirty = True
+        self.capture_note()
         page = self.page
         page = page - 1
         if page < 0:
             page = 0
-        if self.save_extracted_file(self.zf, self.image_files[page]):
-            fname = os.path.join(
-                self.get_activity_root(),
-                'instance',
-                self.make_new_filename(
-                    self.image_files[page]))
-            self.show_image(fname)
-            os.remove(fname)
-            self.show_bookmark_state(page)
+        self.show_page(page)
         v_adjustment = self.scrolled.get_vadjustment()
         v_adjustment.set_value(
             v_adjustment.get_upper() -
             v_adjustment.get_page_size())
         self.set_current_page(page)
-        self.page = page
-        annotation_textbuffer = self.annotation_textview.get_buffer()
-        annotation_textbuffer.set_text(self.annotations.get_note(page))
 
     def set_current_page(self, page):
         self.page = page
         self.update_nav_buttons()
 
     def next_page(self):
-        textbuffer = self.annotation_textview.get_buffer()
-        if self.annotations.add_note(
-            self.page,
-            textbuffer.get_text(
-                textbuffer.get_start_iter(),
-                textbuffer.get_end_iter(),
-                include_hidden_chars=False)):
-            self.annotations_dirty = True
+        self.capture_note()
         page = self.page
         page = page + 1
-        if page >= len(self.image_files):
-            page = len(self.image_files) - 1
-        if self.save_extracted_file(self.zf, self.image_files[page]):
-            fname = os.path.join(
-                self.get_activity_root(),
-                'instance',
-                self.make_new_filename(
-                    self.image_files[page]))
-            self.show_image(fname)
-            os.remove(fname)
-            self.show_bookmark_state(page)
+        if page >= len(self.index):
+            page = len(self.index) - 1
+        self.show_page(page)
         v_adjustment = self.scrolled.get_vadjustment()
         v_adjustment.set_value(v_adjustment.get_lower())
         self.set_current_page(page)
-        self.page = page
-        annotation_textbuffer = self.annotation_textview.get_buffer()
-        annotation_textbuffer.set_text(self.annotations.get_note(page))
-
-    def __draw_cb(self, widget, cr):
-        screen_width = Gdk.Screen.width()
-        if self.saved_screen_width != screen_width and self.saved_screen_width != 0:
-            self.show_page(self.page)
-        self.saved_screen_width = screen_width
-        return False
 
-    def show_page(self, page):
-        self.show_bookmark_state(page)
-        if page not in self.image_files:
+    def __scrolled_size_allocate_cb(self, widget, allocation):
+        # Rotating or resizing sends a burst of allocations, wait for
+        # them to settle and only render the page at the final size.
+        scrollbar_width = \
+            self.scrolled.get_vscrollbar().get_preferred_width()[1]
+        view_size = (
+            max(1, allocation.width - scrollbar_width - VIEW_BORDER),
+            max(1, allocation.height - VIEW_BORDER))
+        if view_size == self._allocated_view_size:
             return
-        if self.save_extracted_file(self.zf, self.image_files[page]):
-            fname = os.path.join(
-                self.get_activity_root(),
-                'instance',
-                self.make_new_filename(
-                    self.image_files[page]))
-            self.show_image(fname)
-            os.remove(fname)
-            annotation_textbuffer = self.annotation_textview.get_buffer()
-            annotation_textbuffer.set_text(self.annotations.get_note(page))
+        self._allocated_view_size = view_size
+        if self._resize_timeout_id:
+            GLib.source_remove(self._resize_timeout_id)
+        self._resize_timeout_id = GLib.timeout_add(
+            RESIZE_DELAY, self.__resize_timeout_cb)
+
+    def __resize_timeout_cb(self):
+        self._resize_timeout_id = 0
+        if self._allocated_view_size != self._view_size:
+            self._view_size = self._allocated_view_size
+            if len(self.index) > 0:
+                self.redraw_page(self.page)
+        return False
 
-    def show_image(self, filename):
-        "display a resized image in a full screen window"
+    def get_view_size(self):
+        "get the size of the area pages are shown in"
+        if self._view_size is not None:
+            return self._view_size
+        # not allocated yet, guess from the size of the screen
         TOOLBOX_HEIGHT = 60
         BORDER_WIDTH = 30
-        # get the size of the fullscreen display
         screen_width = Gdk.Screen.width()
         screen_width = screen_width - BORDER_WIDTH
         screen_height = Gdk.Screen.height()
         screen_height = screen_height - TOOLBOX_HEIGHT
-        # get the size of the image.
-        im = pygame.image.load(filename)
-        image_width, image_height = im.get_size()
-        getcontext().prec = 7
-        s_a_ratio = Decimal(screen_height) / Decimal(screen_width)
-        i_a_ratio = Decimal(image_height) / Decimal(image_width)
-        new_width = image_width
-        new_height = image_height
-        if self.zoom_image_to_fit:
-            if s_a_ratio >= i_a_ratio:
-                new_width = screen_width
-                new_height = image_height * screen_width
-                if image_width > 1:
-                    new_height /= image_width
-
-                if new_height > screen_width:
-                    new_height *= screen_width
-                    if new_width > 1:
-                        new_height /= new_width
-                    new_width = screen_width
-            else:
-                new_height = screen_height
-                new_width = image_width * screen_height
-                if image_height > 1:
-                    new_width /= image_height
-                if new_width > screen_height:
-                    new_width *= screen_height
-                    if new_height > 1:
-                        new_width /= new_height
-                    new_height = screen_height
+        return screen_width, screen_height
+
+    def get_page_key(self, page):
+        "key of a scaled page in the page cache"
+        screen_width, screen_height = self.get_view_size()
+        return (self.index.get_name(page), self.zoom_image_to_fit,
+                screen_width, screen_height)
+
+    def capture_note(self):
+        """Store the note of the current page.
+
+        The text is only copied out of the buffer when the user has
+        changed it since the page was shown."""
+        textbuffer = self.annotation_textview.get_buffer()
+        if not textbuffer.get_modified():
+            return
+        if self.annotations.add_note(
+            self.page,
+            textbuffer.get_text(
+                textbuffer.get_start_iter(),
+                textbuffer.get_end_iter(),
+                include_hidden_chars=True)):
+            self.annotations_dirty = True
+            self.schedule_autosave()
+        textbuffer.set_modified(False)
+
+    def show_page(self, page):
+        if not self.redraw_page(page):
+            return
+        annotation_textbuffer = self.annotation_textview.get_buffer()
+        annotation_textbuffer.set_text(self.annotations.get_note(page))
+        annotation_textbuffer.set_modified(False)
+
+    def redraw_page(self, page):
+        """render a page for the current view size and zoom.
+
+        Unlike show_page the note being edited is left alone, so this
+        is what a resize or zoom uses."""
+        self.show_bookmark_state(page)
+        if self.reader is None or page < 0 or page >= len(self.index):
+            return False
+        key = self.get_page_key(page)
+        self._preview_key = None
+        if self.is_tiled_page(key):
+            shown = self.show_tiled_page(key)
         else:
-            new_width = screen_width
-            new_height = image_height * screen_width
-            if image_width > 1:
-                new_height /= image_width
-
-            if new_height > screen_width:
-                new_height *= screen_width
-                if new_width > 1:
-                    new_height /= new_width
-                new_width = screen_width
-
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file(filename)
-        scaled_buf = pixbuf.scale_simple(
-            new_width, new_height, GdkPixbuf.InterpType.BILINEAR)
-        self.image.set_from_pixbuf(scaled_buf)
+            shown = self.show_scaled_page(key)
+        if not shown:
+            return False
+        self.prefetch_pages(page)
+        return True
+
+    def show_scaled_page(self, key):
+        "show a page scaled to the screen as a single image"
+        scaled_buf = self.page_cache.get(key)
+        if scaled_buf is None and self.use_preview():
+            # show something cheap now, the prefetcher will render the
+            # page properly and _page_prefetched_cb will swap it in.
+            scaled_buf = self.render_preview(key)
+            if scaled_buf is not None:
+                self._preview_key = key
+        if scaled_buf is None:
+            scaled_buf = self.prefetcher.wait(key)
+            if scaled_buf is None:
+                filename, zoom_to_fit, screen_width, screen_height = key
+                new_size = self.get_page_size(key)
+                start = time.time()
+                scaled_buf = self.decode_extracted_file(
+                    self.index.get_info(filename),
+                    lambda f: self.scale_image_data(
+                        f, new_size, zoom_to_fit,
+                        screen_width, screen_height))
+                if scaled_buf is None:
+                    return False
+                self.prefetcher.record_decode_time(time.time() - start)
+            self.page_cache.put(key, scaled_buf)
+        self.set_image_pixbuf(scaled_buf)
+        return True
+
+    def get_page_size(self, key):
+        "look up the size a page is shown at in the page layout"
+        filename, zoom_to_fit, screen_width, screen_height = key
+        if self.page_layout.get_view_size() != (screen_width, screen_height):
+            self.page_layout.compute(
+                self.page_sizes, screen_width, screen_height)
+        return self.page_layout.get_size(filename, zoom_to_fit)
+
+    def is_tiled_page(self, key):
+        "whether a page is tall enough to be drawn in tiles"
+        filename, zoom_to_fit, screen_width, screen_height = key
+        if zoom_to_fit:
+            return False
+        new_size = self.get_page_size(key)
+        return new_size is not None and \
+            new_size[1] > screen_height * TILED_PAGE_HEIGHT
+
+    def show_tiled_page(self, key):
+        """show a tall page zoomed to width one tile at a time.
+
+        The whole page is decoded once, at no more than its own
+        resolution, so it takes memory in proportion to its height.
+        That source is kept until another tall page is shown, and only
+        the tiles in view are scaled from it as the user scrolls."""
+        filename = key[0]
+        new_width, new_height = self.get_page_size(key)
+        image_width, image_height = self.page_sizes[filename]
+        if image_width > new_width:
+            source_width, source_height = new_width, new_height
+        else:
+            # shown larger than it is, resizes keep the same source
+            source_width, source_height = image_width, image_height
+        source = None
+        if self._tiled_source is not None and \
+                self._tiled_source[:3] == (
+                    filename, source_width, source_height):
+            source = self._tiled_source[3]
+        if source is None:
+            def decode(f):
+                return load_pixbuf(f, source_width, source_height)
+            source = self.decode_extracted_file(
+                self.index.get_info(filename), decode)
+            if source is None:
+                return False
+            self._tiled_source = (
+                filename, source_width, source_height, source)
+        self.image.clear()
+        self.image.hide()
+        self.tiled_image.set_source(source, new_width, new_height)
+        self.tiled_image.show()
+        return True
+
+    def set_image_pixbuf(self, pixbuf):
+        self.tiled_image.clear()
+        self.tiled_image.hide()
+        self.image.set_from_pixbuf(pixbuf)
         self.image.show()
 
-    def save_extracted_file(self, zipfile, filename):
-        "Extract the file to a temp directory for viewing"
+    def prefetch_pages(self, page):
+        "queue the pages the user is likely to turn to next"
+        depth = self.prefetcher.get_depth()
+        pages = list(range(page, page + depth + 1))
+        pages.append(page - 1)
+        keys = []
+        for neighbour in pages:
+            if neighbour < 0 or neighbour >= len(self.index):
+                continue
+            key = self.get_page_key(neighbour)
+            if key not in self.page_cache and not self.is_tiled_page(key):
+                keys.append(key)
+        self.prefetcher.prefetch(keys)
+
+    def _page_prefetched_cb(self, key, scaled_buf):
+        self.page_cache.put(key, scaled_buf)
+        if key == self._preview_key:
+            self._preview_key = None
+            self.set_image_pixbuf(scaled_buf)
+
+    def use_preview(self):
+        "whether pages decode slowly enough to be worth a preview"
+        decode_time = self.prefetcher.get_decode_time()
+        return self.progressive_render and decode_time is not None \
+            and decode_time > PREVIEW_LATENCY
+
+    def render_preview(self, key):
+        """quickly render a rough version of a page.
+
+        Only JPEG images can be decoded at a fraction of their size,
+        other formats would cost as much as the page itself, so None is
+        returned for them."""
+        new_size = self.get_page_size(key)
+        if new_size is None:
+            return None
+        new_width, new_height = new_size
+        reader = self.reader
+        if reader is None:
+            return None
+        try:
+            with reader.open(self.index.get_info(key[0])) as f:
+                if get_image_format(f.read(8)) != 'jpeg':
+                    return None
+                f.seek(0)
+                preview = load_pixbuf(
+                    f,
+                    max(1, new_width // PREVIEW_SHRINK),
+                    max(1, new_height // PREVIEW_SHRINK))
+        except (BadZipfile, KeyError, GLib.Error):
+            return None
+        return preview.scale_simple(
+            new_width, new_height, GdkPixbuf.InterpType.NEAREST)
+
+    def render_page(self, key):
+        """decode and resize the page described by a page cache key.
+
+        This is called from the prefetch worker threads, so it must not
+        touch any widgets."""
+        filename, zoom_to_fit, screen_width, screen_height = key
+        reader = self.reader
+        if reader is None:
+            return None
+        with reader.open(self.index.get_info(filename)) as f:
+            return self.scale_image_data(
+                f, self.page_layout.get_size(filename, zoom_to_fit),
+                zoom_to_fit, screen_width, screen_height)
+
+    def show_image(self, filename):
+        "display a resized image in a full screen window"
+        screen_width, screen_height = self.get_view_size()
+        with open(filename, 'rb') as f:
+            scaled_buf = self.scale_image_data(
+                f, None, self.zoom_image_to_fit,
+                screen_width, screen_height)
+        self.set_image_pixbuf(scaled_buf)
+
+    def scale_image_data(self, fileobj, new_size, zoom_to_fit,
+                         screen_width, screen_height):
+        """decode an open image at the size it will be shown on the screen.
+
+        The image is decoded as it is read, so compressed members are
+        never held in memory whole.  new_size comes from the page
+        layout.  Without it the size is read from the image headers,
+        and only images we cannot size that way are decoded at full
+        size and scaled afterwards."""
+        if new_size is None:
+            image_size = probe_image_size(fileobj)
+            fileobj.seek(0)
+            if image_size is None:
+                pixbuf = load_pixbuf(fileobj)
+                new_width, new_height = get_scaled_size(
+                    (pixbuf.get_width(), pixbuf.get_height()),
+                    zoom_to_fit, screen_width, screen_height)
+                return pixbuf.scale_simple(
+                    new_width, new_height, GdkPixbuf.InterpType.BILINEAR)
+            new_size = get_scaled_size(
+                image_size, zoom_to_fit, screen_width, screen_height)
+        # decode straight to the size we want to show
+        new_width, new_height = new_size
+        return load_pixbuf(fileobj, new_width, new_height)
+
+    def decode_extracted_file(self, info, decode):
+        """Decode a file of the archive while it is read.
+
+        decode is called with the open file.  Returns None if the file
+        cannot be read."""
+        if self.reader is None:
+            return None
         try:
-            filebytes = zipfile.read(filename)
+            with self.reader.open(info) as f:
+                return decode(f)
         except BadZipfile as err:
-            print('Error opening the zip file: {}'.format(err))
-            return False
-        except KeyError as err:
-            self._alert('Key Error', 'Zipfile key not found: ' + str(filename))
-            return
-        outfn = self.make_new_filename(filename)
-        if (outfn == ''):
-            return False
-        fname = os.path.join(self.get_activity_root(), 'instance', outfn)
-        with open(fname, 'wb') as f:
-            f.write(filebytes)
+            print('Error reading the zip file: {}'.format(err))
+        return None
 
-        return True
+    def extract_annotations(self, file_path):
+        """Extract the annotations to an instance directory for viewing.
 
-    def extract_pickle_file(self):
-        "Extract the pickle file to an instance directory for viewing"
+        Pages may come from the unpacked cache, which holds no
+        annotations, so they are always read from the archive itself."""
+        reader = self.reader
+        if reader.path != file_path:
+            reader = open_archive(file_path, self.get_tar_index_dir())
+            if reader is None:
+                return False
         try:
-            self.zf.getinfo('annotations.pkl')
-            filebytes = self.zf.read('annotations.pkl')
-            f = open(self.pickle_file_temp, 'wb')
+            return self.extract_annotations_from(reader)
+        finally:
+            if reader is not self.reader:
+                reader.close()
+
+    def extract_annotations_from(self, reader):
+        if os.path.exists(self.annotations_file_temp):
+            os.remove(self.annotations_file_temp)
+        filebytes = reader.read_member(ANNOTATIONS_MEMBER)
+        if filebytes is not None:
+            f = open(self.annotations_file_temp, 'wb')
             try:
                 f.write(filebytes)
             finally:
                 f.close()
             return True
-        except KeyError:
+        # saved by an older version
+        filebytes = reader.read_member(OLD_ANNOTATIONS_MEMBER)
+        if filebytes is None:
+            return False
+        try:
+            self.annotations.import_pickle(filebytes)
+        except (pickle.UnpicklingError, EOFError, ValueError,
+                TypeError, IndexError) as err:
+            print('Cannot read annotations.pkl: {}'.format(err))
             return False
+        return True
 
     def read_file(self, file_path):
         """Load a file from the datastore on activity start"""
         self.get_saved_page_number()
-        self._load_document(os.path.abspath(self.activity_zip.filename))
+        os.rename(file_path, self.activity_zip)
+        self.importer.open_archive(self.activity_zip)
+        self._load_document(os.path.abspath(self.activity_zip))
 
     def __delete_event_cb(self, widget, event):
         os.remove(self.temp_filename)
         return False
 
-    def make_new_filename(self, filename):
-        partition_tuple = filename.rpartition('/')
-        return partition_tuple[2]
-
     def get_saved_page_number(self):
         title = self.metadata.get('title', '')
         if not title[len(title) - 1].isdigit():
@@ -1080,39 +1584,206 @@ class ViewSlidesActivity(activity.Activity):
         self.metadata['title'] = title
 
     def _load_document(self, file_path):
-        "Read the Zip file containing the images"
-        if zipfile.is_zipfile(file_path):
-            self.zf = zipfile.ZipFile(file_path, 'r')
-            self.image_files = self.zf.namelist()
-            self.image_files.sort()
-            self.ls_left.clear()
-            i = 0
-            while i < len(self.image_files):
-                newfn = self.make_new_filename(self.image_files[i])
-                selected_iter = self.ls_left.append()
-                self.ls_left.set(
-                    selected_iter,
-                    COLUMN_IMAGE,
-                    self.image_files[i],
-                    COLUMN_OLD_NAME,
-                    self.image_files[i])
-                i += 1
-
-            self.extract_pickle_file()
-            self.annotations.restore()
-            self.show_page(self.page)
-            self.set_total_pages(len(self.image_files))
-            self.set_current_page(self.page)
-            if self.is_received_document:
-                self.metadata['title'] = self.annotations.get_title()
-                self.metadata['title_set_by_user'] = '1'
+        """Open the Zip or tar file containing the images.
+
+        The archive is opened and indexed on a worker thread.  The saved
+        page is shown as soon as the index is ready, then the page list,
+        page overview and page sizes fill in while the progress bar
+        shows how far along they are."""
+        self.prefetcher.cancel()
+        self.thumbnailer.cancel()
+        self.close_archive()
+        self._annotations_restored = False
+        generation = self._open_generation
+        self.progressbar.set_fraction(0.0)
+        self.progressbar.show()
+        thread = threading.Thread(
+            target=self.open_document, args=(file_path, generation))
+        thread.daemon = True
+        thread.start()
+
+    def get_tar_index_dir(self):
+        return os.path.join(self.get_activity_root(), 'data', 'tar-index')
+
+    def open_document(self, file_path, generation):
+        """open and index an archive, called on a worker thread"""
+        reader = None
+        index = None
+        fingerprint = None
+        try:
+            fingerprint = get_fingerprint(file_path)
+            # books read before are opened from their unpacked pages
+            reader = self.unpacked_cache.open_archive(fingerprint)
+            if reader is None:
+                reader = open_archive(file_path, self.get_tar_index_dir())
+                if reader is not None and \
+                        self.unpacked_cache.should_unpack(fingerprint):
+                    thread = threading.Thread(
+                        target=self.unpacked_cache.unpack,
+                        args=(fingerprint, file_path))
+                    thread.daemon = True
+                    thread.start()
+            if reader is not None:
+                index = ArchiveIndex(reader.infolist())
+        except (OSError, BadZipfile) as err:
+            print('Error opening the archive: {}'.format(err))
+            if reader is not None:
+                reader.close()
+            reader = None
+        GLib.idle_add(self._document_opened_cb, generation, file_path,
+                      reader, index, fingerprint)
+        if reader is not None:
+            page_sizes = self.load_page_sizes(reader, index, generation)
+            GLib.idle_add(self._page_sizes_loaded_cb, generation, page_sizes)
+
+    def _document_opened_cb(self, generation, file_path, reader, index,
+                            fingerprint):
+        if generation != self._open_generation:
+            # another document was opened meanwhile
+            if reader is not None:
+                reader.close()
+            return False
+        if reader is None:
+            print('Not a zip or tar file', file_path)
+            self.index = ArchiveIndex([])
+            self.progressbar.hide()
+            return False
+        # the fingerprint goes first, so thumbnails still being made
+        # for the last document never see the new reader
+        self.fingerprint = fingerprint
+        self.reader = reader
+        self.index = index
+        self.page_sizes = {}
+        self.page_layout.clear()
+        self.page_cache.clear()
+        self._tiled_source = None
+        self.wait_for_autosave()
+        self.extract_annotations(file_path)
+        autosave_path = self.get_autosave_path()
+        if autosave_path is not None and os.path.exists(autosave_path):
+            # the last session ended without saving, take up its notes
+            shutil.copyfile(autosave_path, self.annotations_file_temp)
+            self.annotations_dirty = True
+        self.annotations.restore()
+        self._annotations_restored = True
+        self.show_page(self.page)
+        self.set_total_pages(len(self.index))
+        self.set_current_page(self.page)
+        if self.is_received_document:
+            self.metadata['title'] = self.annotations.get_title()
+            self.metadata['title_set_by_user'] = '1'
+        self.ls_left.clear()
+        self.load_thumbnail_store()
+        self._rows_loaded = 0
+        self._sizes_loaded = 0
+        GLib.idle_add(self._load_rows_cb, generation)
+        return False
+
+    def _load_rows_cb(self, generation):
+        "add the next batch of pages to the page list and overview"
+        if generation != self._open_generation:
+            return False
+        names = self.index.get_names()
+        end = min(len(names), self._rows_loaded + PAGE_LIST_BATCH)
+        batch = names[self._rows_loaded:end]
+        self.append_rows(self.tv_left, self.ls_left,
+                         [[filename, filename] for filename in batch])
+        self.append_rows(
+            self.thumbnail_view, self.thumbnail_store,
+            [[self._thumbnail_placeholder, str(page + 1)]
+             for page in range(self._rows_loaded, end)])
+        self._rows_loaded = end
+        self.update_open_progress()
+        if end < len(names):
+            return True
+        if self.thumbnail_scroller.get_visible():
+            self.update_thumbnails()
+        return False
+
+    def _page_sizes_loaded_cb(self, generation, page_sizes):
+        if generation != self._open_generation or page_sizes is None:
+            return False
+        self.page_sizes = page_sizes
+        screen_width, screen_height = self.get_view_size()
+        self.page_layout.compute(
+            self.page_sizes, screen_width, screen_height)
+        self._sizes_loaded = len(self.index)
+        self.update_open_progress()
+        if self.is_tiled_page(self.get_page_key(self.page)):
+            # now we know the page is too tall to show in one piece
+            self.redraw_page(self.page)
+        return False
+
+    def _page_sizes_progress_cb(self, generation, count):
+        if generation == self._open_generation:
+            self._sizes_loaded = count
+            self.update_open_progress()
+        return False
+
+    def update_open_progress(self):
+        "show how much of the document is loaded in the progress bar"
+        total = 2 * len(self.index)
+        done = self._rows_loaded + self._sizes_loaded
+        if done >= total:
+            self.progressbar.hide()
         else:
-            print('Not a zipfile', file_path)
-            self.activity_zip = None
+            self.progressbar.set_fraction(float(done) / total)
+
+    def close_archive(self):
+        "let go of the archive being viewed"
+        # forget any document still being opened
+        self._open_generation += 1
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        # nothing is shown until the next document is indexed
+        self.index = ArchiveIndex([])
+        self.set_total_pages(0)
+        self.page_cache.clear()
+        self._tiled_source = None
+
+    def convert_archive(self):
+        "Turn a tar archive being viewed into the zip file we save"
+        archive = open_archive(self.activity_zip)
+        if archive is None:
+            return
+        new_zipfile = os.path.join(self.get_activity_root(), 'instance',
+                                   'convert{}'.format(time.time()))
+        try:
+            convert_to_zip(archive, new_zipfile)
+        finally:
+            archive.close()
+        os.remove(self.activity_zip)
+        self.activity_zip = new_zipfile
+
+    def load_page_sizes(self, reader, index, generation):
+        """Build the page geometry table from the image headers.
+
+        This is called on a worker thread, and gives up returning None
+        when another document is opened."""
+        page_sizes = {}
+        for count, filename in enumerate(index.get_names()):
+            if generation != self._open_generation:
+                return None
+            if count % PAGE_LIST_BATCH == 0:
+                GLib.idle_add(
+                    self._page_sizes_progress_cb, generation, count)
+            try:
+                with reader.open(index.get_info(filename)) as f:
+                    image_size = probe_image_size(f)
+            except BadZipfile as err:
+                print('Error opening the zip file: {}'.format(err))
+                continue
+            except (OSError, ValueError):
+                # the archive was closed under us
+                return None
+            if image_size is not None:
+                page_sizes[filename] = image_size
+        return page_sizes
 
     def write_file(self, file_path):
         "Save meta data for the file."
-        if not os.path.exists(self.activity_zip.filename):
+        if not os.path.exists(self.activity_zip):
             zf = zipfile.ZipFile(self.activity_zip, 'w')
             zf.writestr("filler.txt", "filler")
             zf.close()
@@ -1122,27 +1793,34 @@ class ViewSlidesActivity(activity.Activity):
         self.metadata['mime_type'] = 'application/x-cbz'
 
         if self._close_requested:
-            textbuffer = self.annotation_textview.get_buffer()
-            if self.annotations.add_note(
-                self.page,
-                textbuffer.get_text(
-                    textbuffer.get_start_iter(),
-                    textbuffer.get_end_iter(),
-                    include_hidden_chars=True)):
-                self.annotations_dirty = True
-            title = self.metadata.get('title', '')
-            self.annotations.set_title(str(title))
-            self.annotations.save()
-            self.final_rewrite_zip()
+            self.close_archive()
+            if not zipfile.is_zipfile(self.activity_zip):
+                self.convert_archive()
+            if self._autosave_id:
+                GLib.source_remove(self._autosave_id)
+                self._autosave_id = 0
+            self.wait_for_autosave()
+            if self._annotations_restored:
+                self.capture_note()
+                title = self.metadata.get('title', '')
+                self.annotations.set_title(str(title))
+                if self.annotations.is_dirty():
+                    self.annotations_dirty = True
+                self.annotations.save()
+                self.save_annotations()
+                self.remove_autosave()
             os.link(
-                os.path.abspath(self.activity_zip.filename), file_path)
-            os.unlink(os.path.abspath(self.activity_zip.filename))
-            os.remove(self.pickle_file_temp)
+                os.path.abspath(self.activity_zip), file_path)
+            os.unlink(os.path.abspath(self.activity_zip))
+            if os.path.exists(self.annotations_file_temp):
+                os.remove(self.annotations_file_temp)
             self.activity_zip = None
-            self.pickle_file_temp = None
+            self.annotations_file_temp = None
 
     def can_close(self):
         self._close_requested = True
+        self.prefetcher.shutdown()
+        self.thumbnailer.shutdown()
         return True
 
     # The code from here on down is for sharing.
@@ -1241,7 +1919,7 @@ class ViewSlidesActivity(activity.Activity):
     def _share_document(self, buddy):
         """Share the document."""
         if self._want_document:
-            path = os.path.abspath(self.activity_zip.filename)
+            path = os.path.abspath(self.activity_zip)
             self.collab.send_file_file(
                 buddy,
                 path,